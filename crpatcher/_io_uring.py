@@ -0,0 +1,192 @@
+# Copyright 2025 Phi-Long Le. All rights reserved.
+# Use of this source code is governed by a MIT license that can be
+# found in the LICENSE file.
+
+"""
+Optional io_uring backed file reads and checksums, for Linux with the liburing package.
+
+Enabled by setting CRPATCHER_IO_URING=1. All files of a batch are read
+through a single ring: each file keeps one read in flight and completed
+chunks are fed to that file's hasher or contents buffer, so reads of many
+small files are submitted together instead of costing one blocking syscall each.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar, Union
+
+import xxhash
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+__all__ = ["calculate_file_checksums", "is_enabled", "read_files"]
+
+_CHUNK_SIZE = 1 << 20  # 1 MiB
+_QUEUE_DEPTH = 16
+
+_T = TypeVar("_T")
+
+
+def is_enabled() -> bool:
+    """Whether io_uring checksums were requested and can be attempted."""
+    return (
+        liburing is not None
+        and sys.platform == "linux"
+        and os.environ.get("CRPATCHER_IO_URING") == "1"
+    )
+
+
+class _Contents:
+    """Collects the chunks of a file, with the update() of a hasher."""
+
+    __slots__ = ("data",)
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def update(self, chunk: memoryview) -> None:
+        self.data += chunk
+
+
+class _FileRead:
+    """A file being read through the ring."""
+
+    __slots__ = ("fd", "size", "offset", "buffer", "sink")
+
+    def __init__(self, fd: int, buffer: bytearray, sink: Any) -> None:
+        self.fd = fd
+        self.size = os.fstat(fd).st_size
+        self.offset = 0
+        self.buffer = buffer
+        self.sink = sink
+
+
+def calculate_file_checksums(
+    file_paths: Sequence[Path | str],
+) -> List[Union[str, OSError]]:
+    """
+    Calculate xxh3-128 checksums of files, reading them through io_uring.
+
+    Args:
+        file_paths: Paths to the files to calculate checksums for
+
+    Returns:
+        For each file, in order, its hexadecimal checksum or the error that
+        prevented reading it
+
+    Raises:
+        OSError: If the ring cannot be set up, for example on kernels older
+            than 5.6 or where io_uring is disabled
+    """
+    return _read_through_ring(
+        file_paths,
+        xxhash.xxh3_128,
+        lambda checksum_generator: checksum_generator.hexdigest(),
+    )
+
+
+def read_files(file_paths: Sequence[Path | str]) -> List[Union[bytes, OSError]]:
+    """
+    Read whole files through io_uring.
+
+    Args:
+        file_paths: Paths to the files to read
+
+    Returns:
+        For each file, in order, its contents or the error that prevented
+        reading it
+
+    Raises:
+        OSError: If the ring cannot be set up, for example on kernels older
+            than 5.6 or where io_uring is disabled
+    """
+    return _read_through_ring(
+        file_paths, _Contents, lambda contents: bytes(contents.data)
+    )
+
+
+def _read_through_ring(
+    file_paths: Sequence[Path | str],
+    new_sink: Callable[[], Any],
+    finish: Callable[[Any], _T],
+) -> List[Union[_T, OSError]]:
+    """Feed each file to a sink from new_sink() and return finish(sink) per file."""
+    results: List[Optional[Union[_T, OSError]]] = [None] * len(file_paths)
+    in_flight: Dict[int, _FileRead] = {}
+    free_buffers = [
+        bytearray(_CHUNK_SIZE) for _ in range(min(_QUEUE_DEPTH, len(file_paths)))
+    ]
+    next_index = 0
+
+    ring = liburing.Ring()
+    cqe = liburing.Cqe()
+    liburing.io_uring_queue_init(_QUEUE_DEPTH, ring)
+
+    def submit_read(index: int, read: _FileRead) -> None:
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_read(sqe, read.fd, read.buffer, read.offset)
+        liburing.io_uring_sqe_set_data64(sqe, index)
+
+    def start_next_files() -> None:
+        nonlocal next_index
+        while free_buffers and next_index < len(file_paths):
+            index = next_index
+            next_index += 1
+            try:
+                fd = os.open(file_paths[index], os.O_RDONLY | os.O_CLOEXEC)
+            except OSError as err:
+                results[index] = err
+                continue
+
+            read = _FileRead(fd, free_buffers.pop(), new_sink())
+            if read.size == 0:
+                os.close(fd)
+                free_buffers.append(read.buffer)
+                results[index] = finish(read.sink)
+                continue
+
+            in_flight[index] = read
+            submit_read(index, read)
+        liburing.io_uring_submit(ring)
+
+    try:
+        start_next_files()
+        while in_flight:
+            liburing.io_uring_wait_cqe(ring, cqe)
+            completion = cqe[0]
+            index = liburing.io_uring_cqe_get_data64(completion)
+            res = completion.res
+            liburing.io_uring_cqe_seen(ring, completion)
+
+            read = in_flight[index]
+            if res > 0:
+                read.sink.update(memoryview(read.buffer)[:res])
+                read.offset += res
+                if read.offset < read.size:
+                    submit_read(index, read)
+                    liburing.io_uring_submit(ring)
+                    continue
+
+            # Whole file read or the read failed, hand its buffer to the next file
+            del in_flight[index]
+            os.close(read.fd)
+            free_buffers.append(read.buffer)
+            if res < 0:
+                results[index] = OSError(
+                    -res, os.strerror(-res), str(file_paths[index])
+                )
+            else:
+                results[index] = finish(read.sink)
+            start_next_files()
+    finally:
+        for read in in_flight.values():
+            os.close(read.fd)
+        liburing.io_uring_queue_exit(ring)
+
+    return results  # type: ignore[return-value]
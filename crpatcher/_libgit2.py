@@ -0,0 +1,104 @@
+# Copyright 2025 Phi-Long Le. All rights reserved.
+# Use of this source code is governed by a MIT license that can be
+# found in the LICENSE file.
+
+"""
+Optional in-process git operations through libgit2, with the pygit2 package.
+
+Used when pygit2 is installed, in place of spawning a git process for
+resetting files, applying patches and reading HEAD. libgit2 has no
+whitespace-lenient apply, so callers fall back to git apply when a patch
+does not apply exactly.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+__all__ = ["apply_patch_files", "checkout_files", "get_head_sha", "open_repository"]
+
+
+def open_repository(repo_dir: Path) -> Optional["pygit2.Repository"]:
+    """
+    Open the repository whose working tree root is repo_dir.
+
+    Args:
+        repo_dir: Root directory of the repository working tree
+
+    Returns:
+        The repository, or None if pygit2 is not installed or repo_dir is not
+        the root of a non-bare repository, git is run as a process then
+    """
+    if pygit2 is None:
+        return None
+    try:
+        repo = pygit2.Repository(os.fspath(repo_dir))
+    except (pygit2.GitError, KeyError):
+        return None
+    # git resolves paths against its working directory, only take over when
+    # that is the root, which is what libgit2 resolves them against
+    if repo.workdir is None or not os.path.samefile(repo.workdir, repo_dir):
+        return None
+    return repo
+
+
+def checkout_files(repo: "pygit2.Repository", file_paths: Sequence[str]) -> None:
+    """
+    Restore files from the index, like `git checkout -- <paths>`.
+
+    Args:
+        repo: The repository
+        file_paths: Paths relative to the repository root
+
+    Raises:
+        RuntimeError: If libgit2 fails to check out the files
+    """
+    try:
+        repo.checkout_index(
+            paths=list(file_paths), strategy=pygit2.enums.CheckoutStrategy.FORCE
+        )
+    except pygit2.GitError as err:
+        raise RuntimeError(f"libgit2 checkout failed: {err}") from err
+
+
+def apply_patch_files(repo: "pygit2.Repository", patch_files: Sequence[Path]) -> None:
+    """
+    Apply patch files to the working tree, all of them or none.
+
+    Args:
+        repo: The repository
+        patch_files: The patch files, each made by git diff
+
+    Raises:
+        RuntimeError: If a patch cannot be read, parsed or applied exactly
+    """
+    try:
+        patch_contents = b"".join(
+            Path(patch_file).read_bytes() for patch_file in patch_files
+        )
+        repo.apply(
+            pygit2.Diff.parse_diff(patch_contents),
+            location=pygit2.enums.ApplyLocation.WORKDIR,
+        )
+    except (OSError, pygit2.GitError) as err:
+        raise RuntimeError(f"libgit2 apply failed: {err}") from err
+
+
+def get_head_sha(repo: "pygit2.Repository") -> str:
+    """
+    Get the commit sha of the repository HEAD.
+
+    Raises:
+        RuntimeError: If HEAD cannot be resolved, for example in an empty repository
+    """
+    try:
+        return str(repo.head.target)
+    except pygit2.GitError as err:
+        raise RuntimeError(f"libgit2 could not resolve HEAD: {err}") from err
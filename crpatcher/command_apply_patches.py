@@ -1,99 +1,151 @@
-import logging
-import os
-import sys
-from pathlib import Path
-from typing import List
-
-from crpatcher.config import ProgramConfig
-from crpatcher.patch_apply import FileChangeResult, GitPatcher
-
-__all__ = ["command_apply_patches"]
-
-_logger = logging.getLogger(__name__)
-
-_DIVIDER = "-" * 10
-
-
-def _get_path_as_str(path: Path) -> str:
-    posix_str = path.as_posix()
-    return posix_str if posix_str else "Unknown"
-
-
-def _print_file_change_report(file_result: FileChangeResult) -> None:
-    _logger.info(_DIVIDER)
-    _logger.info(
-        f"""{{
-    - file: {_get_path_as_str(file_result.file_path)}
-    - patch: {_get_path_as_str(file_result.patch_path)}
-    - applied because: {file_result.reason or "Unknown"}
-    - error: {file_result.error or "None"}
-    - warning: {file_result.warning or "None"}
-}}"""
-    )
-    _logger.info(_DIVIDER)
-
-
-def _print_report(result: List[FileChangeResult]) -> None:
-    if not result:
-        _logger.info("There are no updates to apply.")
-        return
-
-    successful_files: List[FileChangeResult] = []
-    failed_files: List[FileChangeResult] = []
-
-    for file_result in result:
-        if file_result.error is not None:
-            failed_files.append(file_result)
-        else:
-            successful_files.append(file_result)
-
-    _logger.info(f"There were {len(result)} updates to apply.")
-
-    if successful_files:
-        _logger.info(f"{len(successful_files)} successful:")
-        for file_result in successful_files:
-            _print_file_change_report(file_result)
-
-    if failed_files:
-        _logger.info(f"{len(failed_files)} failed:")
-        for file_result in failed_files:
-            _print_file_change_report(file_result)
-
-
-def command_apply_patches(
-    config: ProgramConfig, should_print_report: bool = False
-) -> None:
-    repo_dirs_list = "  - ".join(
-        f"{'/'.join(path)}{os.linesep}" for path in config.repo_dirs
-    )
-
-    _logger.info(
-        f"Apply patches from {config.patches_dir.as_posix()}{os.linesep}"
-        f"for Chromium-based project {config.chromium_src_dir.as_posix()}{os.linesep}"
-        f"Repository directories:{os.linesep}"
-        f"{repo_dirs_list}"
-    )
-
-    repo_mappings = [
-        (
-            config.chromium_src_dir.joinpath(*path),
-            config.patches_dir.joinpath(*path),
-        )
-        for path in config.repo_dirs
-    ]
-
-    result: List[FileChangeResult] = []
-
-    for repo_dir, patch_dir in repo_mappings:
-        patcher = GitPatcher(patch_dir=patch_dir, git_repo_dir=repo_dir, config=config)
-        result.extend(patcher.apply_patches())
-
-    if should_print_report:
-        _print_report(result)
-
-    if any(patch_file_result.error is not None for patch_file_result in result):
-        _logger.error("Error: Not all patches were successful!")
-        sys.exit(1)
-
-    _logger.info("Patches applied successfully.")
-    sys.exit(0)
+import hashlib
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+from crpatcher.config import ProgramConfig
+from crpatcher.patch_apply import FileChangeResult, GitPatcher
+from crpatcher.util import load_checksum_cache, map_concurrently, save_checksum_cache
+
+__all__ = ["command_apply_patches"]
+
+_logger = logging.getLogger(__name__)
+
+_DIVIDER = "-" * 10
+
+
+def _get_checksum_cache_file(config: ProgramConfig) -> Path:
+    """
+    Get the file that keeps checksums of patched files across runs.
+
+    There is one file per patches_dir.
+
+    The cache holds absolute paths and inode numbers of this machine, so it
+    lives in the user cache directory rather than in the version-controlled
+    patches_dir.
+    """
+    if sys.platform == "win32":
+        cache_dir = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData/Local"
+    else:
+        cache_dir = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    patches_dir_key = hashlib.sha256(
+        os.fsencode(config.patches_dir.absolute())
+    ).hexdigest()[:16]
+    return Path(cache_dir, "crpatcher", f"checksums-{patches_dir_key}.json")
+
+
+def _get_path_as_str(path: Path) -> str:
+    posix_str = path.as_posix()
+    return posix_str if posix_str else "Unknown"
+
+
+def _has_patch_files(patch_dir: Path, config: ProgramConfig) -> bool:
+    """Whether patch_dir holds any .patch or .patchinfo file, stops at the first one."""
+    suffixes = (f".{config.patch_file_ext}", f".{config.patchinfo_file_ext}")
+    try:
+        with os.scandir(patch_dir) as entries:
+            return any(entry.name.endswith(suffixes) for entry in entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
+def _print_file_change_report(file_result: FileChangeResult) -> None:
+    _logger.info(_DIVIDER)
+    _logger.info(
+        f"""{{
+    - file: {_get_path_as_str(file_result.file_path)}
+    - patch: {_get_path_as_str(file_result.patch_path)}
+    - applied because: {file_result.reason or "Unknown"}
+    - error: {file_result.error or "None"}
+    - warning: {file_result.warning or "None"}
+}}"""
+    )
+    _logger.info(_DIVIDER)
+
+
+def _print_report(result: List[FileChangeResult]) -> None:
+    if not result:
+        _logger.info("There are no updates to apply.")
+        return
+
+    successful_files: List[FileChangeResult] = []
+    failed_files: List[FileChangeResult] = []
+
+    for file_result in result:
+        if file_result.error is not None:
+            failed_files.append(file_result)
+        else:
+            successful_files.append(file_result)
+
+    _logger.info(f"There were {len(result)} updates to apply.")
+
+    if successful_files:
+        _logger.info(f"{len(successful_files)} successful:")
+        for file_result in successful_files:
+            _print_file_change_report(file_result)
+
+    if failed_files:
+        _logger.info(f"{len(failed_files)} failed:")
+        for file_result in failed_files:
+            _print_file_change_report(file_result)
+
+
+def command_apply_patches(
+    config: ProgramConfig, should_print_report: bool = False
+) -> None:
+    _logger.info(
+        f"Apply patches from {config.patches_dir.as_posix()}{os.linesep}"
+        f"for Chromium-based project {config.chromium_src_dir.as_posix()}{os.linesep}"
+        f"Repository directories:{os.linesep}"
+        f"{config.repo_dirs_display}"
+    )
+
+    # Skip repos without anything to apply or reset before touching git.
+    # Repos that do have patches are kept even if missing, GitPatcher reports them.
+    repo_mappings: List[Tuple[Path, Path]] = []
+    skipped_repo_dirs: List[str] = []
+    for repo_dir, patch_dir in config.resolved_repo_mappings:
+        if _has_patch_files(patch_dir, config):
+            repo_mappings.append((repo_dir, patch_dir))
+        else:
+            skipped_repo_dirs.append(repo_dir.as_posix())
+
+    if skipped_repo_dirs:
+        _logger.info(
+            f"Skipping repository directories without patches:{os.linesep}"
+            + "".join(f"  - {repo_dir}{os.linesep}" for repo_dir in skipped_repo_dirs)
+        )
+
+    checksum_cache_file = _get_checksum_cache_file(config)
+    load_checksum_cache(checksum_cache_file)
+
+    result: List[FileChangeResult] = []
+
+    def apply_repo_patches(repo_dir: Path, patch_dir: Path) -> List[FileChangeResult]:
+        patcher = GitPatcher(patch_dir=patch_dir, git_repo_dir=repo_dir, config=config)
+        return list(patcher.apply_patches())
+
+    # Repos are independent and each one is dominated by file I/O and git
+    # subprocesses, so threads are enough to overlap them. The results come
+    # back in repo_dirs order, which keeps the report in that order.
+    for repo_result in map_concurrently(
+        apply_repo_patches,
+        [repo_dir for repo_dir, _ in repo_mappings],
+        [patch_dir for _, patch_dir in repo_mappings],
+    ):
+        result.extend(repo_result)
+
+    if config.patches_dir.is_dir():
+        save_checksum_cache(checksum_cache_file)
+
+    if should_print_report:
+        _print_report(result)
+
+    if any(patch_file_result.error is not None for patch_file_result in result):
+        _logger.error("Error: Not all patches were successful!")
+        sys.exit(1)
+
+    _logger.info("Patches applied successfully.")
+    sys.exit(0)
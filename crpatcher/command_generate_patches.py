@@ -11,30 +11,21 @@ _logger = logging.getLogger(__name__)
 
 
 def command_generate_patches(config: ProgramConfig) -> None:
-    repo_dirs_list = "  - ".join(
-        f"{'/'.join(path)}{os.linesep}" for path in config.repo_dirs
-    )
-
     _logger.info(
         f"Generate patches from {config.patches_dir.as_posix()}{os.linesep}"
         f"for Chromium-based project {config.chromium_src_dir.as_posix()}{os.linesep}"
         f"Repository directories:{os.linesep}"
-        f"{repo_dirs_list}"
+        f"{config.repo_dirs_display}"
     )
 
     try:
-        repo_mappings = [
-            (
-                config.chromium_src_dir.joinpath(*path),
-                config.patches_dir.joinpath(*path),
-            )
-            for path in config.repo_dirs
-        ]
+        repo_mappings = config.resolved_repo_mappings
 
         for repo_dir, patch_dir in repo_mappings:
             generator = GitPatchGenerator(
                 git_repo_dir=repo_dir,
                 patch_dir=patch_dir,
+                config=config,
                 relative_paths_to_ignore=None,
                 patch_files_to_keep=None,
             )
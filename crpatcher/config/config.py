@@ -4,12 +4,17 @@
 
 import os
 
-# from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Self
+from typing import Any, NamedTuple, Self, Tuple
 
 import yaml
-from pydantic import BaseModel, Field, dataclass, field_validator
+from pydantic import BaseModel, Field, field_validator
+
+# Prefer the libyaml backed loader, it is much faster than the pure Python one
+try:
+    from yaml import CSafeLoader as _YAMLSafeLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLSafeLoader  # type: ignore[assignment]
 
 __all__ = [
     "ProgramConfig",
@@ -40,7 +45,7 @@ class ConfigValidationError(ConfigErrorBase):
 class PatchInfoConfig(BaseModel):
     """Configuration for patchinfo files."""
 
-    version: int = Field(default=1, description="Version of the patchinfo file format")
+    version: int = Field(default=2, description="Version of the patchinfo file format")
     encoding: str = Field(default="utf-8", description="Encoding of the patchinfo file")
     ext: str = Field(default="patchinfo", description="Extension of the patchinfo file")
 
@@ -77,8 +82,9 @@ class ConfigModel(BaseModel):
         return v
 
 
-@dataclass(frozen=True)
-class ProgramConfig:
+# A plain NamedTuple rather than a (pydantic) dataclass: ConfigModel does the
+# validation, and the commands only need cheap attribute reads afterwards.
+class ProgramConfig(NamedTuple):
     # Example: src/
     chromium_src_dir: Path
 
@@ -91,7 +97,7 @@ class ProgramConfig:
     repo_dirs: list[str]
 
     # Configuration for patchinfo files
-    patchinfo_file_schema_version: int = 1
+    patchinfo_file_schema_version: int = 2
     patchinfo_file_encoding: str = "utf-8"
     patchinfo_file_ext: str = "patchinfo"
     patch_file_ext: str = "patch"
@@ -101,6 +107,14 @@ class ProgramConfig:
     # Its patch will be base-win-embedded_i18n-create_string.cc.patch
     patch_file_replacement_separator: str = "-"
 
+    # Derived from the fields above, computed once by load() so that reading
+    # them is a field read. Left empty when constructing ProgramConfig directly.
+
+    # (repository dir, patch dir) pairs for each entry of repo_dirs
+    resolved_repo_mappings: Tuple[Tuple[Path, Path], ...] = ()
+    # repo_dirs formatted for logging, one "  - <dir>" line per entry
+    repo_dirs_display: str = ""
+
     @classmethod
     def load(cls, config_file: Path | str) -> Self:
         """Load and validate a .crpatcher config file.
@@ -125,13 +139,23 @@ class ProgramConfig:
             raise FileNotFoundError(f"File not found: {config_file_as_str}")
 
         try:
-            with config_file.open("r", encoding="utf-8") as f:
-                config_data: dict[str, Any] = yaml.safe_load(f)
+            # libyaml decodes the bytes itself, skip Python's text decoder
+            config_data: dict[str, Any] = yaml.load(
+                config_file.read_bytes(), Loader=_YAMLSafeLoader
+            )
         except yaml.YAMLError as e:
             raise ConfigYAMLError(
                 f"Invalid YAML format in {config_file_as_str}:{os.linesep}" f"{e}"
             )
 
+        if not isinstance(config_data, dict):
+            raise ConfigYAMLError(
+                f"Invalid YAML format in {config_file_as_str}:{os.linesep}"
+                "Expected a mapping at the top level"
+            )
+
+        # ConfigModel's validator is built once by pydantic-core when the class
+        # is defined, validating here does not re-process the schema.
         try:
             config = ConfigModel.model_validate(config_data)
         except Exception as e:
@@ -139,13 +163,29 @@ class ProgramConfig:
                 f"Config validation failed for {config_file_as_str}:{os.linesep}" f"{e}"
             )
 
+        chromium_src_dir = Path(config.chromium_src_dir)
+        patches_dir = Path(config.patches_dir)
+        repo_dirs = config.submodule_dirs
+
+        repo_dirs_display_parts: list[str] = []
+        append = repo_dirs_display_parts.append
+        for repo_dir in repo_dirs:
+            append("  - ")
+            append(repo_dir)
+            append(os.linesep)
+
         return cls(
-            chromium_src_dir=Path(config.chromium_src_dir),
-            patches_dir=Path(config.patches_dir),
-            repo_dirs=config.submodule_dirs,
+            chromium_src_dir=chromium_src_dir,
+            patches_dir=patches_dir,
+            repo_dirs=repo_dirs,
             patchinfo_file_schema_version=config.patchinfo_file.version,
             patchinfo_file_encoding=config.patchinfo_file.encoding,
             patchinfo_file_ext=config.patchinfo_file.ext,
             patch_file_ext=config.patch_file.ext,
             patch_file_replacement_separator=config.patch_file.replacement_separator,
+            resolved_repo_mappings=tuple(
+                (chromium_src_dir.joinpath(repo_dir), patches_dir.joinpath(repo_dir))
+                for repo_dir in repo_dirs
+            ),
+            repo_dirs_display="".join(repo_dirs_display_parts),
         )
@@ -0,0 +1,63 @@
+# Copyright 2025 Phi-Long Le. All rights reserved.
+# Use of this source code is governed by a MIT license that can be
+# found in the LICENSE file.
+
+# JSON schemas used by crpatcher, kept in sync with schema/*.json
+
+from typing import Any, Dict
+
+__all__ = ["CRPATCHER_SCHEMA", "PATCHINFO_SCHEMA"]
+
+CRPATCHER_SCHEMA: Dict[str, Any] = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": ".crpatcher config",
+    "type": "object",
+    "properties": {
+        "chromium_src_dir": {"type": "string"},
+        "patches_dir": {"type": "string"},
+        "submodule_dirs": {"type": "array", "items": {"type": "string"}},
+        "patchinfo_file": {
+            "type": "object",
+            "properties": {
+                "version": {"type": "number", "default": 2},
+                "encoding": {"type": "string", "default": "utf-8"},
+                "ext": {"type": "string", "default": ".patchinfo"},
+            },
+        },
+        "patch_file": {
+            "type": "object",
+            "properties": {
+                "ext": {"type": "string", "default": ".patch"},
+                "replacement_separator": {"type": "string", "default": "-"},
+            },
+        },
+    },
+    "required": ["chromium_src_dir", "patches_dir", "submodule_dirs"],
+}
+
+PATCHINFO_SCHEMA: Dict[str, Any] = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": ".patchinfo config",
+    "type": "object",
+    "properties": {
+        "schema_version": {"type": "integer", "minimum": 1},
+        "patch_checksum": {"type": ["string", "null"]},
+        "affected_files": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "file_relative_path": {"type": "string"},
+                    "file_checksum": {"type": ["string", "null"]},
+                    "file_mtime_ns": {"type": ["integer", "null"]},
+                    "file_size": {"type": ["integer", "null"]},
+                },
+                "required": ["file_relative_path", "file_checksum"],
+            },
+        },
+        "repo_head_sha": {"type": ["string", "null"]},
+        "patch_file_mtime_ns": {"type": ["integer", "null"]},
+        "patch_file_size": {"type": ["integer", "null"]},
+    },
+    "required": ["schema_version", "patch_checksum", "affected_files"],
+}
@@ -12,6 +12,7 @@ from crpatcher.patch_apply.patch_info import (
     AffectedFileData,
     PatchInfo,
     PatchInfoStaleStatus,
+    RepoWorktreeState,
 )
 
 __all__ = [
@@ -23,4 +24,5 @@ __all__ = [
     "AffectedFileData",
     "PatchInfo",
     "PatchInfoStaleStatus",
+    "RepoWorktreeState",
 ]
@@ -6,23 +6,75 @@ from __future__ import annotations
 
 import logging
 import os
-import re
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from crpatcher import _libgit2
 from crpatcher.config import ProgramConfig
 from crpatcher.patch_apply.patch_apply_status import PatchApplyData as ApplyData
 from crpatcher.patch_apply.patch_apply_status import PatchApplyReasonCreator
 from crpatcher.patch_apply.patch_apply_status import PatchApplyResult as PatchResult
-from crpatcher.patch_apply.patch_info import AffectedFileData, PatchInfo
+from crpatcher.patch_apply.patch_info import (
+    AffectedFileData,
+    PatchInfo,
+    RepoWorktreeState,
+)
 from crpatcher.patch_apply.patch_info import PatchInfoStaleStatus as StaleStatus
-from crpatcher.util import calculate_file_checksum, run_git
+from crpatcher.util import (
+    calculate_file_checksums_batch,
+    invalidate_checksum_cache,
+    map_concurrently,
+    read_files_batch,
+    run_git,
+    run_git_stream,
+)
 
 _logger = logging.getLogger(__name__)
 
 
-@dataclass
+def _count_diff_sections(patch_contents: bytes) -> int:
+    """
+    Counts the per-file sections of a patch made by git diff.
+
+    Lines inside hunks start with " ", "+" or "-", so a line starting with
+    "diff --git " is always a file header.
+
+    :param patch_contents: Contents of the patch file.
+    :return: Number of `diff --git` headers.
+    """
+    return patch_contents.count(b"\ndiff --git ") + patch_contents.startswith(
+        b"diff --git "
+    )
+
+
+def _parse_numstat_paths(records: Iterable[str]) -> List[str]:
+    """
+    Extracts the file paths from `git apply --numstat -z` output.
+
+    Each file is an "<added>\t<deleted>\t<path>" record terminated by NUL.
+    For renames and copies the path is empty and the old and new paths follow
+    as two further NUL terminated records, the new path is the affected one.
+
+    :param records: NUL separated records of `git apply --numstat -z`, as
+        streamed by run_git_stream.
+    :return: Paths relative to the repository root, in output order.
+    """
+    records = iter(records)
+    paths: List[str] = []
+    for record in records:
+        if not record:
+            continue
+
+        path = record.split("\t", 2)[2]
+        if not path:
+            next(records, "")  # old path
+            path = next(records, "")
+        paths.append(path)
+    return paths
+
+
+@dataclass(slots=True)
 class FileChangeResult:
     """Result of a file change operation, either from applying a patch or resetting to original state
 
@@ -54,6 +106,8 @@ class GitPatcher:
         self._APPLY_ARGS = ["--ignore-space-change", "--ignore-whitespace"]
         self._config = config
         self._reason_creator = PatchApplyReasonCreator(config)
+        # In-process libgit2 when pygit2 is installed, otherwise git processes
+        self._libgit2_repo = _libgit2.open_repository(git_repo_dir)
 
     def apply_patches(self) -> List[FileChangeResult]:
         """
@@ -86,32 +140,77 @@ class GitPatcher:
                 f'Could not apply patches. Repo "{self._git_repo_dir}" is not a directory or does not exist'
             )
 
-        all_patch_files = self._patch_dir.glob(f"*.{self._config.patch_file_ext}")
-        all_patchinfo_files = self._patch_dir.glob(
-            f"*.{self._config.patchinfo_file_ext}"
-        )
+        # Scan the directory once for both kinds of files, keyed by their name
+        # without extension so that sibling checks are dict lookups
+        patch_suffix = f".{self._config.patch_file_ext}"
+        patchinfo_suffix = f".{self._config.patchinfo_file_ext}"
+        all_patch_files: Dict[str, Path] = {}
+        all_patchinfo_files: Dict[str, Path] = {}
+        with os.scandir(self._patch_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.endswith(patch_suffix) and entry.is_file():
+                    all_patch_files[name[: -len(patch_suffix)]] = Path(entry.path)
+                elif name.endswith(patchinfo_suffix) and entry.is_file():
+                    all_patchinfo_files[name[: -len(patchinfo_suffix)]] = Path(
+                        entry.path
+                    )
 
         patches_to_apply: List[ApplyData] = []
         obsolete_patchinfo_files: List[Path] = []
 
-        for patch_file in all_patch_files:
-            expected_patchinfo_file = patch_file.with_suffix(
-                f".{self._config.patchinfo_file_ext}"
-            )
+        worktree_state = self.get_worktree_state()
 
-            _logger.info(f"Checking .patchinfo file for {patch_file.as_posix()}:")
+        # Every check parses its .patchinfo file, read them all in one batch
+        # up front. .patch files are left alone, they are only read when
+        # their stat changed.
+        checked_stems = [
+            stem for stem in all_patch_files if stem in all_patchinfo_files
+        ]
+        patchinfo_contents: Dict[str, Optional[bytes]] = dict(
+            zip(
+                checked_stems,
+                read_files_batch([all_patchinfo_files[stem] for stem in checked_stems]),
+            )
+        )
 
-            stale_status = PatchInfo.get_stale_status(
+        def check_patch(stem: str, patch_file: Path) -> StaleStatus:
+            if stem not in all_patchinfo_files:
+                return StaleStatus.NO_PATCHINFO
+            return PatchInfo.get_stale_status(
                 repo_dir=self._git_repo_dir,
                 patch_file=patch_file,
-                patchinfo_file=expected_patchinfo_file,
+                patchinfo_file=all_patchinfo_files[stem],
+                config=self._config,
+                worktree_state=worktree_state,
+                patchinfo_contents=patchinfo_contents[stem],
             )
 
+        # Each check is independent and mostly waits on stat and file reads.
+        # The results come back in directory order, which keeps the log and the
+        # apply order.
+        patch_items = list(all_patch_files.items())
+        stale_statuses = map_concurrently(
+            check_patch,
+            [stem for stem, _ in patch_items],
+            [patch_file for _, patch_file in patch_items],
+        )
+
+        # Progress is logged per file, skip building the messages altogether
+        # when INFO is filtered out
+        log_info = _logger.isEnabledFor(logging.INFO)
+
+        for (stem, patch_file), stale_status in zip(patch_items, stale_statuses):
+            expected_patchinfo_file = self._patch_dir / (stem + patchinfo_suffix)
+
+            if log_info:
+                _logger.info(f"Checking .patchinfo file for {patch_file.as_posix()}:")
+
             if stale_status != StaleStatus.NONE:
                 apply_reason = self._reason_creator.from_patchinfo_stale_status(
                     stale_status
                 )
-                _logger.info(f"----> Adding to TO_PATCH list, reason: {apply_reason}")
+                _logger.info("----> Adding to TO_PATCH list, reason: %s", apply_reason)
                 patches_to_apply.append(
                     ApplyData(
                         patch_path=patch_file,
@@ -120,20 +219,19 @@ class GitPatcher:
                     )
                 )
             else:
-                _logger.info(f"----> Nothing changed, skipping the .patch file.")
+                _logger.info("----> Nothing changed, skipping the .patch file.")
 
-        for patchinfo_file in all_patchinfo_files:
-            expected_patch_file = patchinfo_file.with_suffix(
-                f".{self._config.patch_file_ext}"
-            )
-            _logger.info(f"Reading .patch file for {patchinfo_file.as_posix()}:")
-            if not expected_patch_file.is_file():
+        for stem, patchinfo_file in all_patchinfo_files.items():
+            if log_info:
+                _logger.info(f"Reading .patch file for {patchinfo_file.as_posix()}:")
+            if stem not in all_patch_files:
                 _logger.info(
-                    f"----> Adding to TO_RESET list, reason: {self._reason_creator.patch_removed()}"
+                    "----> Adding to TO_RESET list, reason: %s",
+                    self._reason_creator.patch_removed(),
                 )
                 obsolete_patchinfo_files.append(patchinfo_file)
             else:
-                _logger.info(f"----> Nothing changed, skipping the .patchinfo file.")
+                _logger.info("----> Nothing changed, skipping the .patchinfo file.")
 
         result: List[FileChangeResult] = []
         try:
@@ -160,30 +258,43 @@ class GitPatcher:
         :param patches_to_apply: List of dictionaries containing patch details.
         :return: List of dictionaries with status of applied patches.
         """
-        processing_patches: List[PatchResult] = []
+        processing_patches = [
+            PatchResult(data=patch_data) for patch_data in patches_to_apply
+        ]
+        log_info = _logger.isEnabledFor(logging.INFO)
 
         _logger.info(os.linesep + "Getting patch data...")
-        for patch_data in patches_to_apply:
-            patch_result = PatchResult(data=patch_data)
-            _logger.info(
-                f"Getting affected files from patch {patch_data.patch_path.as_posix()}"
-            )
-            try:
-                patch_result.affected_files = self.get_affected_files_data(
-                    patch_result.data.patch_path
-                )
-                patch_result.error = None
-            except RuntimeError as err:
-                patch_result.affected_files = []
-                patch_result.error = f"Could not read data from patch file: {err}"
-                _logger.info(patch_result.error)
-
-            processing_patches.append(patch_result)
+        affected_files_per_patch = self.get_affected_files_data_batch(
+            [patch_result.data.patch_path for patch_result in processing_patches]
+        )
+        if affected_files_per_patch is not None:
+            for patch_result, affected_files in zip(
+                processing_patches, affected_files_per_patch
+            ):
+                patch_result.affected_files = affected_files
+        else:
+            # Some patch is unreadable, go one by one to find out which
+            for patch_result in processing_patches:
+                if log_info:
+                    _logger.info(
+                        f"Getting affected files from patch {patch_result.data.patch_path.as_posix()}"
+                    )
+                try:
+                    patch_result.affected_files = self.get_affected_files_data(
+                        patch_result.data.patch_path
+                    )
+                    patch_result.error = None
+                except RuntimeError as err:
+                    patch_result.affected_files = []
+                    patch_result.error = f"Could not read data from patch file: {err}"
+                    _logger.info(patch_result.error)
 
         _logger.info("Resetting affected files before applying patches...")
 
+        # Git takes the paths as they come from the patches, relative to the
+        # repository root, so no Path objects are built for them
         files_to_reset = [
-            self._git_repo_dir.joinpath(entry.file_relative_path)
+            entry.file_relative_path
             for p in processing_patches
             if p.error is None
             for entry in p.affected_files
@@ -193,82 +304,84 @@ class GitPatcher:
             self.reset_files_in_repo(files_to_reset)
         except RuntimeError:
             _logger.warning(
-                f"Warning: There were some failures during git reset of specific repo paths: {' '.join(filepath.as_posix() for filepath in files_to_reset)}",
+                f"Warning: There were some failures during git reset of specific repo paths: {' '.join(files_to_reset)}",
             )
 
         _logger.info("Done reset.")
 
         _logger.info("Applying patches...")
 
-        # Apply patches (in series)
-        for patch_result in processing_patches:
-            # skip error patches, we wont try to process them anyway.
-            if patch_result.error is not None:
-                continue
+        # skip error patches, we wont try to process them anyway.
+        patches_to_run = [p for p in processing_patches if p.error is None]
 
-            _logger.info(f"Applying {patch_result.data.patch_path.as_posix()}")
-            try:
-                run_git(
-                    self._git_repo_dir,
-                    ["apply", patch_result.data.patch_path.as_posix()]
-                    + self._APPLY_ARGS,
+        # Apply all patches with a single git process. git apply is atomic
+        # over its arguments, if any patch fails nothing is applied, so only
+        # then apply them in series to find out which ones failed.
+        try:
+            if patches_to_run:
+                _logger.info(f"Applying {len(patches_to_run)} patches at once")
+                self.apply_patch_files(
+                    [p.data.patch_path for p in patches_to_run], log_error=False
                 )
-            except RuntimeError as err:
-                patch_result.error = str(err)
-                _logger.error(f"---- {err}")
+        except RuntimeError:
+            _logger.info("Some patches failed to apply, applying them one by one...")
+            for patch_result in patches_to_run:
+                if log_info:
+                    _logger.info(f"Applying {patch_result.data.patch_path.as_posix()}")
+                try:
+                    self.apply_patch_files([patch_result.data.patch_path])
+                except RuntimeError as err:
+                    patch_result.error = str(err)
+                    _logger.error(f"---- {err}")
 
         _logger.info("Finish applying.")
 
+        # Reset and apply rewrote these files, possibly within the same mtime
+        # tick as their last checksum, forget what was hashed before
+        repo_dir_str = os.fspath(self._git_repo_dir)
+        invalidate_checksum_cache(
+            os.path.join(repo_dir_str, file_relative_path)
+            for file_relative_path in files_to_reset
+        )
+
         # Create .pathinfo files for success patches
         _logger.info("Updating .patchinfo files...")
 
-        for patch_result in processing_patches:
-            if patch_result.error is None:
-                try:
-                    # Calculate patch checksum
-                    patch_checksum = calculate_file_checksum(
-                        patch_result.data.patch_path
-                    )
+        try:
+            head_sha: Optional[str] = self.get_head_sha()
+        except RuntimeError:
+            head_sha = None
 
-                    # Update checksums for all affected files after applying patch
-                    for affected_file in patch_result.affected_files:
-                        try:
-                            file_path = self._git_repo_dir.joinpath(
-                                affected_file.file_relative_path
-                            )
-                            affected_file.file_checksum = calculate_file_checksum(
-                                file_path
-                            )
-                        except Exception as err:
-                            patch_result.error = f"Failed to calculate checksum for affected file {affected_file.file_relative_path}: {err}"
-                            _logger.error(f"---- {err}")
-                            break
-
-                    if patch_result.error is not None:
-                        continue
-
-                except Exception as err:
-                    patch_result.error = f"Failed to calculate patch checksum: {err}"
-                    _logger.error(f"---- {err}")
-                    continue
+        applied_patches = [p for p in processing_patches if p.error is None]
+        patch_file_data = self._calculate_applied_checksums(applied_patches)
 
-                patchinfo = PatchInfo(
-                    schema_version=self._config.patchinfo_file_schema_version,
-                    patch_checksum=patch_checksum,
-                    affected_files=patch_result.affected_files,
-                )
+        for index, patch_result in enumerate(applied_patches):
+            if patch_result.error is not None:
+                continue
+
+            patch_checksum, patch_stat = patch_file_data[index]
+            patchinfo = PatchInfo(
+                schema_version=self._config.patchinfo_file_schema_version,
+                patch_checksum=patch_checksum,
+                affected_files=patch_result.affected_files,
+                repo_head_sha=head_sha,
+                patch_file_mtime_ns=patch_stat.st_mtime_ns,
+                patch_file_size=patch_stat.st_size,
+            )
+            if log_info:
                 _logger.info(
                     f"Writing to {patch_result.data.patchinfo_path.as_posix()}"
                 )
-                patchinfo.write(patch_result.data.patchinfo_path)
+            patchinfo.write(patch_result.data.patchinfo_path, self._config)
 
         # Provide apply result as per file
         result: List[FileChangeResult] = []
+        repo_dir = self._git_repo_dir
         for patch_result in processing_patches:
             if patch_result.affected_files:
                 result.extend(
                     FileChangeResult(
-                        file_path=self._git_repo_dir.joinpath(entry.file_relative_path),
+                        file_path=repo_dir.joinpath(entry.file_relative_path),
                         patch_path=patch_result.data.patch_path,
                         reason=patch_result.data.reason,
                         error=patch_result.error,
@@ -289,6 +402,127 @@ class GitPatcher:
 
         return result
 
+    def _calculate_applied_checksums(
+        self, applied_patches: List[PatchResult]
+    ) -> Dict[int, Tuple[str, os.stat_result]]:
+        """
+        Calculates checksums of applied patch files and of their affected files.
+
+        Affected files get their checksum, mtime and size filled in. Patches
+        with a file that cannot be read get their error set instead.
+
+        :param applied_patches: Patches that were applied successfully.
+        :return: Checksum and stat of the patch file, by index in applied_patches.
+        """
+        # Stat everything first, then hash all files of all patches in one batch
+        # on the shared checksum pool. Stats are taken before hashing, so a
+        # write in between shows up as a changed mtime later.
+        repo_dir_str = os.fspath(self._git_repo_dir)
+        patch_stats: Dict[int, os.stat_result] = {}
+        jobs: List[Tuple[int, Optional[AffectedFileData], str]] = []
+        for index, patch_result in enumerate(applied_patches):
+            try:
+                patch_stats[index] = patch_result.data.patch_path.stat()
+            except OSError as err:
+                patch_result.error = f"Failed to calculate patch checksum: {err}"
+                _logger.error(f"---- {err}")
+                continue
+            jobs.append((index, None, os.fspath(patch_result.data.patch_path)))
+
+            for affected_file in patch_result.affected_files:
+                file_path = os.path.join(repo_dir_str, affected_file.file_relative_path)
+                try:
+                    file_stat = os.stat(file_path)
+                except OSError as err:
+                    patch_result.error = f"Failed to calculate checksum for affected file {affected_file.file_relative_path}: {err}"
+                    _logger.error(f"---- {err}")
+                    break
+                affected_file.file_mtime_ns = file_stat.st_mtime_ns
+                affected_file.file_size = file_stat.st_size
+                jobs.append((index, affected_file, file_path))
+
+        result: Dict[int, Tuple[str, os.stat_result]] = {}
+        while jobs:
+            # A failing file ends the batch, record it and go on with the rest
+            done_count = 0
+            try:
+                for checksum in calculate_file_checksums_batch(
+                    [file_path for _, _, file_path in jobs]
+                ):
+                    index, affected_file, _ = jobs[done_count]
+                    if affected_file is None:
+                        result[index] = (checksum, patch_stats[index])
+                    else:
+                        affected_file.file_checksum = checksum
+                    done_count += 1
+                jobs = []
+            except Exception as err:
+                index, affected_file, _ = jobs[done_count]
+                if affected_file is None:
+                    applied_patches[index].error = (
+                        f"Failed to calculate patch checksum: {err}"
+                    )
+                else:
+                    applied_patches[index].error = (
+                        f"Failed to calculate checksum for affected file {affected_file.file_relative_path}: {err}"
+                    )
+                _logger.error(f"---- {err}")
+                jobs = jobs[done_count + 1 :]
+
+        return result
+
+    def get_affected_files_data_batch(
+        self, patch_paths: List[Path]
+    ) -> Optional[List[List[AffectedFileData]]]:
+        """
+        Gets the lists of files several patches apply to, with a single git call.
+
+        git prints the records of all patches back to back without a separator,
+        one per file section, so they are split up by counting the
+        `diff --git` headers of each patch.
+
+        :param patch_paths: Paths to the patch files.
+        :return: List of affected files per patch, or None if some patch could
+            not be read or its records could not be told apart.
+        """
+        if not patch_paths:
+            return []
+
+        try:
+            section_counts = [
+                _count_diff_sections(patch_path.read_bytes())
+                for patch_path in patch_paths
+            ]
+            file_relative_paths = _parse_numstat_paths(
+                run_git_stream(
+                    self._git_repo_dir,
+                    ["apply", "--numstat", "-z"]
+                    + self._APPLY_ARGS
+                    + [patch_path.as_posix() for patch_path in patch_paths],
+                    separator="\0",
+                    log_error=False,
+                )
+            )
+        except (OSError, RuntimeError):
+            return None
+
+        if len(file_relative_paths) != sum(section_counts):
+            return None
+
+        result: List[List[AffectedFileData]] = []
+        start = 0
+        for section_count in section_counts:
+            result.append(
+                [
+                    AffectedFileData(file_relative_path, None)
+                    for file_relative_path in file_relative_paths[
+                        start : start + section_count
+                    ]
+                ]
+            )
+            start += section_count
+        return result
+
     def get_affected_files_data(self, patch_path: Path) -> List[AffectedFileData]:
         """
         Gets the list of files a patch applies to.
@@ -296,11 +530,6 @@ class GitPatcher:
         :param patch_path: Path to the patch file.
         :return: List of file paths the patch applies to.
         """
-        # Interpret `--numstat -z` line format
-        # https:#regex101.com/r/jP1JEP/1
-        REGEX_GIT_APPLY_NUM_STATS = re.compile(r"^((\d|-)+\s+){2}")
-
-        result: List[AffectedFileData] = []
         apply_stat_args: list[str] = [
             "apply",
             patch_path.as_posix(),
@@ -309,41 +538,92 @@ class GitPatcher:
         ] + self._APPLY_ARGS
 
         try:
-            output = run_git(self._git_repo_dir, apply_stat_args)
-            for line in output.splitlines():
-                line = line.strip()
-                if line:
-                    # Intrepret `--numstat -z` line format
-                    affected_file_relative_path_as_str = re.sub(
-                        REGEX_GIT_APPLY_NUM_STATS, "", line
-                    ).replace("\0", "")
-
-                    affected_file = self._git_repo_dir.joinpath(
-                        affected_file_relative_path_as_str
-                    )
-                    checksum = calculate_file_checksum(affected_file)
-
-                    result.append(
-                        AffectedFileData(affected_file_relative_path_as_str, checksum)
-                    )
-            return result
+            file_relative_paths = _parse_numstat_paths(
+                run_git_stream(self._git_repo_dir, apply_stat_args, separator="\0")
+            )
         except RuntimeError as err:
             raise RuntimeError(
                 f'Error getting applies-to data for patch "{patch_path}": {err}'
             )
 
-    def reset_files_in_repo(self, files: List[Path]):
+        # Checksums are taken once the patch is applied
+        return [
+            AffectedFileData(file_relative_path, None)
+            for file_relative_path in file_relative_paths
+        ]
+
+    def get_head_sha(self) -> str:
+        """
+        Gets the commit sha of the repository HEAD.
+
+        :return: The HEAD commit sha.
+        """
+        if self._libgit2_repo is not None:
+            return _libgit2.get_head_sha(self._libgit2_repo)
+        return run_git(self._git_repo_dir, ["rev-parse", "HEAD"]).strip()
+
+    def get_worktree_state(self) -> RepoWorktreeState:
+        """
+        Creates the git state of the repository working tree.
+
+        Nothing is asked from git here, the state is queried on first use.
+
+        :return: The state, shared by the stale checks of one run.
+        """
+        return RepoWorktreeState(self._git_repo_dir, self.get_head_sha)
+
+    def reset_files_in_repo(self, files: List[str]):
         """
         Resets specified repository files to their original state.
 
-        :param files: List of file paths to reset.
+        :param files: List of file paths to reset, relative to the repository root.
         """
+        if not files:
+            return
+
+        if self._libgit2_repo is not None:
+            try:
+                _libgit2.checkout_files(self._libgit2_repo, files)
+            except RuntimeError as err:
+                raise RuntimeError(f"Error resetting repo files: {err}")
+            return
+
         try:
-            as_str_paths = [file.as_posix() for file in files]
-            run_git(self._git_repo_dir, ["checkout"] + as_str_paths)
+            # Paths go through stdin, a long list would not fit on the command
+            # line, and NUL separated so that no path needs quoting
+            run_git(
+                self._git_repo_dir,
+                ["checkout", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                input_text="\0".join(files),
+            )
         except RuntimeError as err:
             raise RuntimeError(f"Error resetting repo files: {err}")
 
+    def apply_patch_files(self, patch_files: List[Path], log_error: bool = True):
+        """
+        Applies patch files to the repository, all of them or none.
+
+        :param patch_files: List of patch file paths.
+        :param log_error: Whether a failing git apply logs its error.
+        :raises RuntimeError: If the patches could not be applied.
+        """
+        if self._libgit2_repo is not None:
+            try:
+                _libgit2.apply_patch_files(self._libgit2_repo, patch_files)
+                return
+            except RuntimeError as err:
+                # libgit2 only applies exactly, git apply may still manage
+                # with its whitespace options
+                _logger.info(f"Retrying with git apply: {err}")
+
+        run_git(
+            self._git_repo_dir,
+            ["apply"]
+            + self._APPLY_ARGS
+            + [patch_file.as_posix() for patch_file in patch_files],
+            log_error=log_error,
+        )
+
     def handle_obsolete_patchinfos(
         self, obsolete_patchinfo_files: List[Path]
     ) -> List[FileChangeResult]:
@@ -354,12 +634,18 @@ class GitPatcher:
         :return: List of dictionaries containing status information.
         """
 
-        files_to_reset: List[Path] = []
+        if not obsolete_patchinfo_files:
+            return []
+
+        files_to_reset: List[str] = []
         result: List[FileChangeResult] = []
+        repo_dir = self._git_repo_dir
+        patch_suffix = f".{self._config.patch_file_ext}"
+        reason = self._reason_creator.patch_removed()
 
-        for patchinfo_file in obsolete_patchinfo_files:
+        def remove_patchinfo(patchinfo_file: Path) -> Optional[PatchInfo]:
             try:
-                patchinfo = PatchInfo.parse(patchinfo_file)
+                patchinfo = PatchInfo.parse(patchinfo_file, self._config)
                 # remove .patchinfo file
                 patchinfo_file.unlink(missing_ok=True)
             except Exception as err:
@@ -367,19 +653,28 @@ class GitPatcher:
                 _logger.info(
                     f"Warning: Could not remove obsolete PatchInfo file at {patchinfo_file}: {err}",
                 )
+                return None
+            return patchinfo
+
+        # Reading and removing each file is independent I/O, do it concurrently
+        # and reset the files of all of them afterwards with one git call
+        patchinfos = map_concurrently(remove_patchinfo, obsolete_patchinfo_files)
+
+        for patchinfo_file, patchinfo in zip(obsolete_patchinfo_files, patchinfos):
+            if patchinfo is None:
                 continue
 
             files_to_reset.extend(
-                self._git_repo_dir.joinpath(affected_file_data.file_relative_path)
+                affected_file_data.file_relative_path
                 for affected_file_data in patchinfo.affected_files
             )
+            # Same .patch path and reason for all files of a .patchinfo
+            patch_file = patchinfo_file.with_suffix(patch_suffix)
             result.extend(
                 FileChangeResult(
-                    file_path=self._git_repo_dir.joinpath(entry.file_relative_path),
-                    patch_path=patchinfo_file.with_suffix(
-                        f".{self._config.patch_file_ext}"
-                    ),
-                    reason=self._reason_creator.patch_removed(),
+                    file_path=repo_dir.joinpath(entry.file_relative_path),
+                    patch_path=patch_file,
+                    reason=reason,
                     error=None,
                     warning=None,
                 )
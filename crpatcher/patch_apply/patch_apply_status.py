@@ -6,10 +6,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from crpatcher.config import ProgramConfig
-from crpatcher.patch_apply import AffectedFileData, PatchInfoStaleStatus
+from crpatcher.patch_apply.patch_info import AffectedFileData, PatchInfoStaleStatus
 
 
 class PatchApplyReasonCreator:
@@ -17,11 +17,23 @@ class PatchApplyReasonCreator:
 
     def __init__(self, config: ProgramConfig) -> None:
         self._config = config
+        # Messages only depend on config, format them once up front
+        self._reasons: Dict[PatchInfoStaleStatus, str] = {
+            PatchInfoStaleStatus.NONE: "None",
+            PatchInfoStaleStatus.NO_PATCHINFO: f"No corresponding .{config.patchinfo_file_ext} file was found.",
+            PatchInfoStaleStatus.PATCHINFO_OUTDATED: (
+                f"The corresponding .{config.patchinfo_file_ext} file was unreadable "
+                f"or not in the correct schema version of {config.patchinfo_file_schema_version}."
+            ),
+            PatchInfoStaleStatus.PATCH_CHANGED: f"The .{config.patch_file_ext} file was modified since last applied.",
+            PatchInfoStaleStatus.SRC_CHANGED: "The target file was modified since the patch was last applied.",
+        }
+        self._patch_removed_reason = (
+            f"The .{config.patch_file_ext} file was removed since last applied."
+        )
 
     def patch_removed(self) -> str:
-        return (
-            f"The .{self._config.patch_file_ext} file was removed since last applied."
-        )
+        return self._patch_removed_reason
 
     def from_patchinfo_stale_status(self, status: PatchInfoStaleStatus) -> str:
         """Convert a PatchInfoStaleStatus to a PatchApplyReason message.
@@ -35,28 +47,16 @@ class PatchApplyReasonCreator:
         Raises:
             ValueError: If the status is not a recognized PatchInfoStaleStatus value
         """
-        match status:
-            case PatchInfoStaleStatus.NONE:
-                return "None"
-            case PatchInfoStaleStatus.NO_PATCHINFO:
-                return f"No corresponding .{self._config.patchinfo_file_ext} file was found."
-            case PatchInfoStaleStatus.PATCHINFO_OUTDATED:
-                return (
-                    f"The corresponding .{self._config.patchinfo_file_ext} file was unreadable "
-                    f"or not in the correct schema version of {self._config.patchinfo_file_schema_version}."
-                )
-            case PatchInfoStaleStatus.PATCH_CHANGED:
-                return f"The .{self._config.patch_file_ext} file was modified since last applied."
-            case PatchInfoStaleStatus.SRC_CHANGED:
-                return "The target file was modified since the patch was last applied."
-
-        raise ValueError(
-            f"Unknown stale status: {status}. "
-            f"Expected one of: {', '.join(s.name for s in PatchInfoStaleStatus)}"
-        )
+        try:
+            return self._reasons[status]
+        except KeyError:
+            raise ValueError(
+                f"Unknown stale status: {status}. "
+                f"Expected one of: {', '.join(s.name for s in PatchInfoStaleStatus)}"
+            ) from None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PatchApplyData:
     """Data required to apply a patch.
 
@@ -71,7 +71,7 @@ class PatchApplyData:
     reason: str
 
 
-@dataclass
+@dataclass(slots=True)
 class PatchApplyResult:
     """Result of a patch apply operation.
 
@@ -4,22 +4,100 @@
 
 from __future__ import annotations
 
+import codecs
 import json
 import logging
-from dataclasses import asdict, dataclass
+import os
+import threading
+from dataclasses import dataclass
 from enum import IntEnum, unique
 from pathlib import Path
-from typing import Any, Dict, List, Optional, cast
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, cast
 
-from jsonschema import validate
-from jsonschema.exceptions import ValidationError
+import orjson
 
-from crpatcher.config import PATCHINFO_SCHEMA, ProgramConfig
-from crpatcher.util import calculate_file_checksum
+from crpatcher.config import ProgramConfig
+from crpatcher.util import (
+    calculate_file_checksum,
+    calculate_file_checksums_batch,
+    chunk_paths,
+    is_file_unchanged,
+    run_git_stream,
+)
 
 _logger = logging.getLogger(__name__)
 
 
+def _is_int(value: Any) -> bool:
+    # JSON schema integers exclude booleans, which are ints in Python
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_optional_str(data: Dict[str, Any], key: str) -> None:
+    value = data.get(key)
+    if value is not None and not isinstance(value, str):
+        raise TypeError(f'"{key}" must be a string or null')
+
+
+def _check_optional_int(data: Dict[str, Any], key: str) -> None:
+    value = data.get(key)
+    if value is not None and not _is_int(value):
+        raise TypeError(f'"{key}" must be an integer or null')
+
+
+def _validate_patchinfo(data: Any) -> None:
+    """
+    Check data loaded from a .patchinfo file against PATCHINFO_SCHEMA.
+
+    The schema is small and stable, straight-line checks are cheaper than
+    going through a generic JSON schema validator for every file.
+
+    Raises:
+        TypeError: If data does not match the schema
+    """
+    if not isinstance(data, dict):
+        raise TypeError("data must be an object")
+
+    schema_version = data.get("schema_version")
+    if not _is_int(schema_version) or schema_version < 1:
+        raise TypeError('"schema_version" must be an integer >= 1')
+    if "patch_checksum" not in data:
+        raise TypeError('"patch_checksum" is required')
+    _check_optional_str(data, "patch_checksum")
+    _check_optional_str(data, "repo_head_sha")
+    _check_optional_int(data, "patch_file_mtime_ns")
+    _check_optional_int(data, "patch_file_size")
+
+    affected_files = data.get("affected_files")
+    if not isinstance(affected_files, list):
+        raise TypeError('"affected_files" must be an array')
+    for file_data in affected_files:
+        if not isinstance(file_data, dict):
+            raise TypeError('"affected_files" items must be objects')
+        if not isinstance(file_data.get("file_relative_path"), str):
+            raise TypeError('"file_relative_path" must be a string')
+        if "file_checksum" not in file_data:
+            raise TypeError('"file_checksum" is required')
+        _check_optional_str(file_data, "file_checksum")
+        _check_optional_int(file_data, "file_mtime_ns")
+        _check_optional_int(file_data, "file_size")
+
+
+def _parse_porcelain_paths(records: Iterable[str]) -> Set[str]:
+    """Get the paths of `git status --porcelain -z` records."""
+    # Records are "XY path", renames and copies are followed by an extra
+    # record holding the original path
+    paths: Set[str] = set()
+    records = iter(records)
+    for record in records:
+        if not record:
+            continue
+        paths.add(record[3:])
+        if record[0] in "RC":
+            paths.add(next(records, ""))
+    return paths
+
+
 @unique
 class PatchInfoStaleStatus(IntEnum):
     """Status indicating whether a patch needs to be reapplied."""
@@ -31,40 +109,136 @@ class PatchInfoStaleStatus(IntEnum):
     SRC_CHANGED = 4  # Target files changed since last patch application
 
 
-@dataclass
+class RepoWorktreeState:
+    """Git state of a repository working tree, queried on first use.
+
+    Shared by the checks of one apply run. git is only asked once a check
+    finds affected files whose stat changed, and then only about those files.
+    """
+
+    def __init__(self, repo_dir: Path, get_head_sha: Callable[[], str]) -> None:
+        """
+        Args:
+            repo_dir: Root directory of the repository working tree
+            get_head_sha: Returns the commit sha of HEAD, raises RuntimeError
+                if it cannot be resolved
+        """
+        self._repo_dir = repo_dir
+        self._get_head_sha = get_head_sha
+        self._head_sha: Optional[str] = None
+        self._head_sha_read = False
+        self._lock = threading.Lock()
+
+    @property
+    def head_sha(self) -> Optional[str]:
+        """Commit sha of HEAD, or None if git could not resolve it."""
+        with self._lock:
+            if not self._head_sha_read:
+                try:
+                    self._head_sha = self._get_head_sha()
+                except RuntimeError as err:
+                    _logger.info("Could not read HEAD, checking all files: %s", err)
+                self._head_sha_read = True
+            return self._head_sha
+
+    def get_reset_paths(self, relative_paths: List[str]) -> Set[str]:
+        """
+        Get which of the paths git reports as identical to HEAD.
+
+        Only normally tracked files count. git status does not look at the
+        content of assume-unchanged and skip-worktree entries, nor of
+        untracked or ignored files, so whether those were reset is unknown.
+
+        Args:
+            relative_paths: Paths relative to the repository root
+
+        Returns:
+            The reset paths, none if git fails, then callers hash the files
+        """
+        tracked_paths: Set[str] = set()
+        changed_paths: Set[str] = set()
+        try:
+            # Neither command reads pathspecs from stdin, so the paths are
+            # passed in chunks that fit on the command line
+            for paths in chunk_paths(relative_paths):
+                # `ls-files -v` tags normal entries "H", skip-worktree ones
+                # "S" and assume-unchanged ones in lowercase
+                for record in run_git_stream(
+                    self._repo_dir,
+                    ["--literal-pathspecs", "ls-files", "-z", "-v", "--"] + paths,
+                    separator="\0",
+                    log_error=False,
+                ):
+                    if record.startswith("H "):
+                        tracked_paths.add(record[2:])
+                changed_paths |= _parse_porcelain_paths(
+                    run_git_stream(
+                        self._repo_dir,
+                        ["--literal-pathspecs", "status", "--porcelain", "-z"]
+                        + ["--untracked-files=no", "--"]
+                        + paths,
+                        separator="\0",
+                        log_error=False,
+                    )
+                )
+        except (RuntimeError, ValueError) as err:
+            _logger.info("Could not read git status, hashing the files: %s", err)
+            return set()
+        return tracked_paths - changed_paths
+
+
+@dataclass(slots=True)
 class AffectedFileData:
     """Information about a file affected by a patch.
 
     Attributes:
         file_relative_path: Path to the file relative to repository root
-        file_checksum: SHA-256 checksum of the file, or None if not calculated
+        file_checksum: xxh3-128 checksum of the file, or None if not calculated
+        file_mtime_ns: Modification time of the file when its checksum was
+            calculated, or None if unknown
+        file_size: Size of the file when its checksum was calculated, or None
+            if unknown
     """
 
     file_relative_path: str
     file_checksum: Optional[str]
+    file_mtime_ns: Optional[int] = None
+    file_size: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PatchInfo:
     """Information about a patch and its affected files.
 
     Attributes:
         schema_version: Version of the patchinfo file format
-        patch_checksum: SHA-256 checksum of the patch file
+        patch_checksum: xxh3-128 checksum of the patch file
         affected_files: List of files modified by this patch
+        repo_head_sha: Commit sha of the repository HEAD when the patch was
+            applied, or None if unknown
+        patch_file_mtime_ns: Modification time of the patch file when its
+            checksum was calculated, or None if unknown
+        patch_file_size: Size of the patch file when its checksum was
+            calculated, or None if unknown
     """
 
     schema_version: int
     patch_checksum: Optional[str]
     affected_files: List[AffectedFileData]
+    repo_head_sha: Optional[str] = None
+    patch_file_mtime_ns: Optional[int] = None
+    patch_file_size: Optional[int] = None
 
     @staticmethod
-    def parse(patchinfo_file: Path, config: ProgramConfig) -> PatchInfo:
+    def parse(
+        patchinfo_file: Path, config: ProgramConfig, contents: Optional[bytes] = None
+    ) -> PatchInfo:
         """
         Construct PatchInfo from a .patchinfo file.
 
         Args:
             patchinfo_file: Path to the .patchinfo file to read
+            contents: Contents of the file if already read, it is not opened then
 
         Returns:
             New PatchInfo instance with data from file
@@ -74,34 +248,66 @@ class PatchInfo:
             Exception: If file cannot be read or parsed
         """
         try:
-            with patchinfo_file.open(
-                "r", encoding=config.patchinfo_file_encoding
-            ) as file:
-                data: Any = json.load(file)
-
-                # Validate against schema
-                validate(instance=data, schema=PATCHINFO_SCHEMA)
-                data = cast(Dict[str, Any], data)
-
-                return PatchInfo(
-                    schema_version=data["schema_version"],
-                    patch_checksum=data["patch_checksum"],
-                    affected_files=[
-                        AffectedFileData(
-                            file_relative_path=file_data["file_relative_path"],
-                            file_checksum=file_data["file_checksum"],
-                        )
-                        for file_data in data["affected_files"]
-                    ],
-                )
+            if contents is None:
+                contents = patchinfo_file.read_bytes()
+            # orjson reads UTF-8 bytes as they are, other encodings are decoded first
+            if codecs.lookup(config.patchinfo_file_encoding).name == "utf-8":
+                data: Any = orjson.loads(contents)
+            else:
+                data = orjson.loads(contents.decode(config.patchinfo_file_encoding))
+
+            # Validate against schema
+            _validate_patchinfo(data)
+            data = cast(Dict[str, Any], data)
+
+            return PatchInfo(
+                schema_version=data["schema_version"],
+                patch_checksum=data["patch_checksum"],
+                affected_files=[
+                    AffectedFileData(
+                        file_relative_path=file_data["file_relative_path"],
+                        file_checksum=file_data["file_checksum"],
+                        file_mtime_ns=file_data.get("file_mtime_ns"),
+                        file_size=file_data.get("file_size"),
+                    )
+                    for file_data in data["affected_files"]
+                ],
+                repo_head_sha=data.get("repo_head_sha"),
+                patch_file_mtime_ns=data.get("patch_file_mtime_ns"),
+                patch_file_size=data.get("patch_file_size"),
+            )
 
-        except (ValidationError, TypeError) as err:
+        except TypeError as err:
             raise TypeError(f"Invalid {config.patchinfo_file_ext} file: {err}")
         except Exception as err:
             raise RuntimeError(
                 f'Error reading {config.patchinfo_file_ext} file "{patchinfo_file}": {err}'
             )
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert this PatchInfo instance to the dictionary stored in .patchinfo files.
+
+        Returns:
+            Dictionary matching PATCHINFO_SCHEMA
+        """
+        return {
+            "schema_version": self.schema_version,
+            "patch_checksum": self.patch_checksum,
+            "affected_files": [
+                {
+                    "file_relative_path": affected_file.file_relative_path,
+                    "file_checksum": affected_file.file_checksum,
+                    "file_mtime_ns": affected_file.file_mtime_ns,
+                    "file_size": affected_file.file_size,
+                }
+                for affected_file in self.affected_files
+            ],
+            "repo_head_sha": self.repo_head_sha,
+            "patch_file_mtime_ns": self.patch_file_mtime_ns,
+            "patch_file_size": self.patch_file_size,
+        }
+
     def write(self, patchinfo_out_file: Path, config: ProgramConfig) -> None:
         """
         Write this PatchInfo instance to a file.
@@ -113,10 +319,17 @@ class PatchInfo:
             Exception: If the file cannot be written
         """
         try:
-            with patchinfo_out_file.open(
-                mode="w", encoding=config.patchinfo_file_encoding
-            ) as out:
-                json.dump(asdict(self), out, indent=2)
+            # orjson writes UTF-8 with non-ASCII characters as they are, other
+            # encodings get the \u escapes of json instead
+            if codecs.lookup(config.patchinfo_file_encoding).name == "utf-8":
+                patchinfo_out_file.write_bytes(
+                    orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2)
+                )
+            else:
+                with patchinfo_out_file.open(
+                    mode="w", encoding=config.patchinfo_file_encoding
+                ) as out:
+                    json.dump(self.to_dict(), out, indent=2)
         except Exception as err:
             raise RuntimeError(
                 f'Error writing {config.patchinfo_file_ext} file at path "{patchinfo_out_file}": {err}'
@@ -124,7 +337,12 @@ class PatchInfo:
 
     @staticmethod
     def get_stale_status(
-        repo_dir: Path, patch_file: Path, patchinfo_file: Path, config: ProgramConfig
+        repo_dir: Path,
+        patch_file: Path,
+        patchinfo_file: Path,
+        config: ProgramConfig,
+        worktree_state: Optional[RepoWorktreeState] = None,
+        patchinfo_contents: Optional[bytes] = None,
     ) -> PatchInfoStaleStatus:
         """
         Check if a patch needs to be reapplied.
@@ -138,59 +356,126 @@ class PatchInfo:
             repo_dir: Path to the repository root directory
             patch_file: Path to the patch file to check
             patchinfo_file: Path to the corresponding .patchinfo file
+            worktree_state: Optional git state of repo_dir, used to detect
+                reverted files without hashing them
+            patchinfo_contents: Contents of patchinfo_file if already read
 
         Returns:
             PatchInfoStaleStatus indicating whether/why the patch needs reapplication
         """
         try:
-            if not patchinfo_file.is_file():
+            if patchinfo_contents is None and not patchinfo_file.is_file():
                 return PatchInfoStaleStatus.NO_PATCHINFO
-            patchinfo = PatchInfo.parse(patchinfo_file, config)
+            patchinfo = PatchInfo.parse(patchinfo_file, config, patchinfo_contents)
         except Exception as err:
             _logger.error(
-                f"Error parsing {config.patchinfo_file_ext} file at {patchinfo_file}: {err}"
+                "Error parsing %s file at %s: %s",
+                config.patchinfo_file_ext,
+                patchinfo_file,
+                err,
             )
             return PatchInfoStaleStatus.PATCHINFO_OUTDATED
 
         if patchinfo.schema_version != config.patchinfo_file_schema_version:
             return PatchInfoStaleStatus.PATCHINFO_OUTDATED
 
-        # Check if patch file changed
-        _logger.info(
-            f"{config.patch_file_ext} checksum from {config.patchinfo_file_ext} data: {patchinfo.patch_checksum}"
-        )
-        try:
-            current_patch_checksum = calculate_file_checksum(patch_file)
-            _logger.info(
-                f"Current {config.patch_file_ext} checksum: {current_patch_checksum}"
-            )
-        except Exception as err:
-            _logger.error(
-                f"Error calculating checksum for {config.patch_file_ext} file {patch_file}: {err}"
-            )
-            return PatchInfoStaleStatus.PATCH_CHANGED
-
-        if current_patch_checksum != patchinfo.patch_checksum:
-            return PatchInfoStaleStatus.PATCH_CHANGED
-
-        # Check if affected files changed
-        for entry in patchinfo.affected_files:
-            _logger.info(f"Checking file: {entry.file_relative_path}")
+        # A patch file with the recorded mtime and size was not rewritten since
+        # its checksum was taken, skip hashing it. Log calls below use lazy
+        # %-style arguments, they run once per file and are mostly filtered out.
+        if is_file_unchanged(
+            patch_file, patchinfo.patch_file_mtime_ns, patchinfo.patch_file_size
+        ):
+            _logger.info("%s file unchanged since last apply", config.patch_file_ext)
+        else:
             _logger.info(
-                f"----> File checksum from {config.patchinfo_file_ext} data: {entry.file_checksum}"
+                "%s checksum from %s data: %s",
+                config.patch_file_ext,
+                config.patchinfo_file_ext,
+                patchinfo.patch_checksum,
             )
             try:
-                current_checksum = calculate_file_checksum(
-                    repo_dir.joinpath(entry.file_relative_path)
+                current_patch_checksum = calculate_file_checksum(patch_file)
+                _logger.info(
+                    "Current %s checksum: %s",
+                    config.patch_file_ext,
+                    current_patch_checksum,
                 )
-                _logger.info(f"----> Current checksum: {current_checksum}")
             except Exception as err:
                 _logger.error(
-                    f"Error calculating checksum for file {entry.file_relative_path}: {err}"
+                    "Error calculating checksum for %s file %s: %s",
+                    config.patch_file_ext,
+                    patch_file,
+                    err,
                 )
-                return PatchInfoStaleStatus.SRC_CHANGED
+                return PatchInfoStaleStatus.PATCH_CHANGED
 
-            if current_checksum != entry.file_checksum:
-                return PatchInfoStaleStatus.SRC_CHANGED
+            if current_patch_checksum != patchinfo.patch_checksum:
+                return PatchInfoStaleStatus.PATCH_CHANGED
+
+        # Check if affected files changed
+        if not patchinfo.affected_files:
+            return PatchInfoStaleStatus.NONE
+
+        # Files with the recorded mtime and size still hold the checksummed
+        # content, only hash the others. Paths are joined as plain strings,
+        # building a Path per entry costs more than the stat itself.
+        repo_dir_str = os.fspath(repo_dir)
+        paths_to_hash: List[str] = []
+        entries_to_hash: List[AffectedFileData] = []
+        for entry in patchinfo.affected_files:
+            file_path = os.path.join(repo_dir_str, entry.file_relative_path)
+            if not is_file_unchanged(file_path, entry.file_mtime_ns, entry.file_size):
+                paths_to_hash.append(file_path)
+                entries_to_hash.append(entry)
+
+        # Applying the patch left every affected file that git tracks
+        # modified. With HEAD unchanged, a tracked file that git reports as
+        # unmodified is back to its original content, so it was reset and
+        # there is no need to hash it. Files whose stat is unchanged were not
+        # touched, git is not asked about them.
+        if (
+            entries_to_hash
+            and worktree_state is not None
+            and patchinfo.repo_head_sha is not None
+            and patchinfo.repo_head_sha == worktree_state.head_sha
+        ):
+            reset_paths = worktree_state.get_reset_paths(
+                [entry.file_relative_path for entry in entries_to_hash]
+            )
+            for entry in entries_to_hash:
+                if entry.file_relative_path in reset_paths:
+                    _logger.info(
+                        "File %s is unmodified in git, it was reset.",
+                        entry.file_relative_path,
+                    )
+                    return PatchInfoStaleStatus.SRC_CHANGED
+
+        # Hash the affected files concurrently, but consume the results in
+        # order so the logs and the first reported mismatch stay deterministic.
+        affected_file_checksums = calculate_file_checksums_batch(paths_to_hash)
+        try:
+            for entry in entries_to_hash:
+                _logger.info("Checking file: %s", entry.file_relative_path)
+                _logger.info(
+                    "----> File checksum from %s data: %s",
+                    config.patchinfo_file_ext,
+                    entry.file_checksum,
+                )
+                try:
+                    current_checksum = next(affected_file_checksums)
+                except Exception as err:
+                    _logger.error(
+                        "Error calculating checksum for file %s: %s",
+                        entry.file_relative_path,
+                        err,
+                    )
+                    return PatchInfoStaleStatus.SRC_CHANGED
+
+                _logger.info("----> Current checksum: %s", current_checksum)
+                if current_checksum != entry.file_checksum:
+                    return PatchInfoStaleStatus.SRC_CHANGED
+        finally:
+            # One changed file is enough, skip hashing the remaining ones
+            affected_file_checksums.close()
 
         return PatchInfoStaleStatus.NONE
@@ -5,15 +5,77 @@
 from __future__ import annotations
 
 import logging
+import mmap
 import os
+import re
+import tempfile
+import threading
 from pathlib import Path
-from typing import Callable, List, Optional
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 from crpatcher.config import ProgramConfig
-from crpatcher.util import run_git
+from crpatcher.util import chunk_paths, map_concurrently, run_git
 
 _logger = logging.getLogger(__name__)
 
+# Lines inside hunks start with " ", "+" or "-", so this only matches file headers
+_DIFF_HEADER_PATTERN = re.compile(rb"^diff --git ", re.MULTILINE)
+_QUOTED_DIFF_HEADER_PATTERN = re.compile(rb'^diff --git "', re.MULTILINE)
+
+_DIFF_ARGS = ["diff", "--src-prefix=a/", "--dst-prefix=b/", "--full-index"]
+
+
+def _split_diff_by_path(
+    diff_output: Union[bytes, mmap.mmap],
+) -> Dict[str, Tuple[int, int]]:
+    """Split git diff output into the section of each file, keyed by its path.
+
+    Sections are only keyed when the path can be read back unambiguously from
+    an unquoted "diff --git a/<path> b/<path>" header, others are left out.
+
+    Returns:
+        The start and end offsets of each section within diff_output
+    """
+    starts = [match.start() for match in _DIFF_HEADER_PATTERN.finditer(diff_output)]
+    sections: Dict[str, Tuple[int, int]] = {}
+    for start, end in zip(starts, starts[1:] + [len(diff_output)]):
+        header_end = diff_output.find(b"\n", start, end)
+        header = diff_output[
+            start + len(b"diff --git ") : end if header_end == -1 else header_end
+        ].decode("utf-8", "surrogateescape")
+        path_length = (len(header) - len("a/ b/")) // 2
+        path = header[len("a/") : len("a/") + path_length]
+        if header == f"a/{path} b/{path}":
+            sections[path] = (start, end)
+    return sections
+
+
+def _write_diff_sections(diff_file: Path, patch_files: Dict[str, Path]) -> Set[str]:
+    """Copy the section of each file in diff_file to its patch file.
+
+    Returns:
+        The paths whose patch file was written
+    """
+    written_paths: Set[str] = set()
+    with open(diff_file, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return written_paths
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for path, (start, end) in _split_diff_by_path(mapped).items():
+                patch_file = patch_files.get(path)
+                if patch_file is not None:
+                    patch_file.write_bytes(mapped[start:end])
+                    written_paths.add(path)
+    return written_paths
+
 
 class GitPatchGenerator:
     """Generates and manages patch files from Git repository changes."""
@@ -22,6 +84,7 @@ class GitPatchGenerator:
         self,
         git_repo_dir: Path,
         patch_dir: Path,
+        config: ProgramConfig,
         relative_paths_to_ignore: Optional[Callable[[str], bool]] = None,
         patch_files_to_keep: Optional[List[str]] = None,
     ):
@@ -30,11 +93,13 @@ class GitPatchGenerator:
         Args:
             git_repo_dir: Path to the Git repository
             patch_dir: Directory where patch files should be stored
+            config: Program configuration
             relative_paths_to_ignore: Optional filter function to filter modified paths
             patch_files_to_keep: List of patch filenames to never delete
         """
         self._git_repo_dir = git_repo_dir
         self._patch_dir = patch_dir
+        self._config = config
         self._relative_paths_to_ignore_filter = relative_paths_to_ignore
         self._patch_files_to_keep = patch_files_to_keep or []
 
@@ -81,43 +146,145 @@ class GitPatchGenerator:
 
         # Format patch filenames
         patch_filenames = [
-            Path(relative_path)
-            .as_posix()
-            .replace("/", ProgramConfig.patch_file_replacement_separator)
-            + f".{ProgramConfig.patch_file_ext}"
+            self._get_patch_filename(relative_path)
             for relative_path in modified_relative_paths
         ]
 
+        patch_files = {
+            relative_path: self._patch_dir.joinpath(patch_filename)
+            for relative_path, patch_filename in zip(
+                modified_relative_paths, patch_filenames
+            )
+        }
+
+        # Diff many files per git process, which writes straight to a file that
+        # is then split by file. Patches are never decoded, they are copied as
+        # git wrote them. Files missing from the output, e.g. with quoted
+        # paths, are diffed on their own.
+        path_chunks = list(chunk_paths(modified_relative_paths))
+        written_paths: Set[str] = set()
+        with tempfile.TemporaryDirectory() as temp_dir:
+
+            def diff_chunk(index: int, relative_paths: List[str]) -> Set[str]:
+                diff_file = Path(temp_dir, f"diff{index}")
+                try:
+                    run_git(
+                        self._git_repo_dir,
+                        _DIFF_ARGS + ["--"] + relative_paths,
+                        log_error=False,
+                        stdout_path=diff_file,
+                    )
+                except RuntimeError as e:
+                    _logger.info(f"Diffing {len(relative_paths)} files one by one: {e}")
+                    return set()
+                try:
+                    return _write_diff_sections(diff_file, patch_files)
+                except Exception as e:
+                    raise Exception(f"Failed to write patch files: {e}") from e
+
+            for chunk_written_paths in map_concurrently(
+                diff_chunk, range(len(path_chunks)), path_chunks
+            ):
+                written_paths |= chunk_written_paths
+
         write_ops_done_count = 0
         patch_count = len(modified_relative_paths)
+        progress_lock = threading.Lock()
 
-        _logger.info(f"Writing {patch_count} .patch files:")
-        for modified_file, patch_filename in zip(
-            modified_relative_paths, patch_filenames
-        ):
+        def write_patch_file(modified_file: str, patch_filename: str) -> None:
+            nonlocal write_ops_done_count
             try:
-                single_diff_args = [
-                    "diff",
-                    "--src-prefix=a/",
-                    "--dst-prefix=b/",
-                    "--full-index",
-                    modified_file,
-                ]
-                patch_contents = run_git(self._git_repo_dir, single_diff_args)
-                patch_file = self._patch_dir.joinpath(patch_filename)
-                patch_file.write_text(patch_contents)
-
-                write_ops_done_count += 1
-                _logger.info(
-                    f"----wrote {write_ops_done_count} / {patch_count}: {patch_filename}"
-                )
+                if modified_file not in written_paths:
+                    run_git(
+                        self._git_repo_dir,
+                        _DIFF_ARGS + [modified_file],
+                        stdout_path=patch_files[modified_file],
+                    )
+
+                with progress_lock:
+                    write_ops_done_count += 1
+                    _logger.info(
+                        f"----wrote {write_ops_done_count} / {patch_count}: "
+                        f"{patch_filename}"
+                    )
             except Exception as e:
                 raise Exception(
                     f"Failed to write patch file {patch_filename}: {e}"
                 ) from e
 
+        _logger.info(f"Writing {patch_count} .patch files:")
+        map_concurrently(write_patch_file, modified_relative_paths, patch_filenames)
+
         return patch_filenames
 
+    def write_modified_patch_files(self) -> Optional[List[str]]:
+        """Generate patch files for all modified paths from a single git diff.
+
+        The diff of the whole repository is split by file, paths rejected by
+        the ignore filter are left out.
+
+        Returns:
+            List of generated patch filenames, or None if a file header of the
+            diff cannot be read back and nothing was written
+
+        Raises:
+            Exception: If git diff, patch directory creation or file writing fails
+        """
+        try:
+            self._patch_dir.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            raise Exception(f"Failed to create patch directory: {e}") from e
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            diff_file = Path(temp_dir, "diff")
+            run_git(
+                self._git_repo_dir,
+                _DIFF_ARGS + ["--ignore-submodules", "--diff-filter=M"],
+                stdout_path=diff_file,
+            )
+
+            with open(diff_file, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return []
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if _QUOTED_DIFF_HEADER_PATTERN.search(mapped):
+                        return None
+                    sections = _split_diff_by_path(mapped)
+                    if self._relative_paths_to_ignore_filter:
+                        sections = {
+                            path: section
+                            for path, section in sections.items()
+                            if self._relative_paths_to_ignore_filter(path)
+                        }
+
+                    patch_count = len(sections)
+                    patch_filenames: List[str] = []
+                    _logger.info(f"Writing {patch_count} .patch files:")
+                    for path, (start, end) in sections.items():
+                        patch_filename = self._get_patch_filename(path)
+                        try:
+                            self._patch_dir.joinpath(patch_filename).write_bytes(
+                                mapped[start:end]
+                            )
+                        except Exception as e:
+                            raise Exception(
+                                f"Failed to write patch file {patch_filename}: {e}"
+                            ) from e
+                        patch_filenames.append(patch_filename)
+                        _logger.info(
+                            f"----wrote {len(patch_filenames)} / {patch_count}: "
+                            f"{patch_filename}"
+                        )
+        return patch_filenames
+
+    def _get_patch_filename(self, relative_path: str) -> str:
+        return (
+            Path(relative_path)
+            .as_posix()
+            .replace("/", self._config.patch_file_replacement_separator)
+            + f".{self._config.patch_file_ext}"
+        )
+
     def remove_stale_patch_files(self, patch_filenames: List[str]) -> None:
         """Remove patch files that are no longer associated with modified files.
 
@@ -133,8 +300,14 @@ class GitPatchGenerator:
 
         _logger.info("Remove stale .patch files if needed:")
 
+        patch_suffix = f".{self._config.patch_file_ext}"
         try:
-            existing_patch_filenames = [f.name for f in self._patch_dir.glob("*.patch")]
+            with os.scandir(self._patch_dir) as entries:
+                existing_patch_filenames = [
+                    entry.name
+                    for entry in entries
+                    if entry.name.endswith(patch_suffix) and entry.is_file()
+                ]
             valid_filenames = set(patch_filenames + self._patch_files_to_keep)
             to_remove_filenames = [
                 f for f in existing_patch_filenames if f not in valid_filenames
@@ -147,7 +320,7 @@ class GitPatchGenerator:
             remove_count = len(to_remove_filenames)
             for i, filename in enumerate(to_remove_filenames, 1):
                 try:
-                    (self._patch_dir / filename).unlink()
+                    os.unlink(os.path.join(self._patch_dir, filename))
                     _logger.info(f"----removed {i}/{remove_count}: {filename}")
                 except Exception as e:
                     raise Exception(
@@ -166,15 +339,20 @@ class GitPatchGenerator:
             f"Updating patches for {self._git_repo_dir}, saving to {self._patch_dir}:"
         )
         try:
-            modified_relative_paths = self.get_modified_relative_paths()
-            if self._relative_paths_to_ignore_filter:
-                modified_relative_paths = list(
-                    filter(
-                        self._relative_paths_to_ignore_filter, modified_relative_paths
+            # One git diff gives both the modified paths and their patches,
+            # unless a path is quoted in it, then they are listed and diffed apart
+            patch_files = self.write_modified_patch_files()
+            if patch_files is None:
+                modified_relative_paths = self.get_modified_relative_paths()
+                if self._relative_paths_to_ignore_filter:
+                    modified_relative_paths = list(
+                        filter(
+                            self._relative_paths_to_ignore_filter,
+                            modified_relative_paths,
+                        )
                     )
-                )
+                patch_files = self.write_patch_files(modified_relative_paths)
 
-            patch_files = self.write_patch_files(modified_relative_paths)
             self.remove_stale_patch_files(patch_files)
         except Exception as e:
             raise Exception(f"Unexpected error during patch update: {e}") from e
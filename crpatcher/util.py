@@ -1,150 +1,740 @@
-from __future__ import annotations
-
-import hashlib
-import logging
-import os
-import shutil
-import subprocess
-from dataclasses import fields, is_dataclass
-from pathlib import Path
-from typing import Any, Dict, List, Type, TypeVar
-
-__all__ = [
-    "calculate_file_checksum",
-    "run_git",
-    "validate_dict_keys_match_dataclass",
-]
-
-_logger = logging.getLogger(__name__)
-
-
-def run_git(
-    git_repo_dir: Path,
-    git_args: List[str],
-    verbose: bool = False,
-    log_error: bool = True,
-) -> str:
-    """
-    Run a git command in the specified repository.
-
-    Args:
-        git_repo_dir: Path to the git repository directory
-        git_args: List of git command arguments to execute
-        verbose: If True, print command output to logs
-        log_error: If True, log error messages when command fails
-
-    Returns:
-        The stdout output of the git command as a string
-
-    Raises:
-        ValueError: If git_repo_dir doesn't exist or git_args is empty
-        RuntimeError: If the git command fails or returns non-zero exit code
-    """
-    if not git_repo_dir.is_dir():
-        raise ValueError(f"Git repository directory does not exist: {git_repo_dir}")
-
-    if not git_args:
-        raise ValueError("Git arguments cannot be empty")
-
-    # Validate git installation
-    if not shutil.which("git"):
-        raise ValueError("Git executable not found in PATH")
-
-    # Construct safe command list
-    cmd = ["git"] + git_args
-
-    try:
-        result = subprocess.run(
-            cmd,
-            cwd=git_repo_dir,
-            text=True,
-            capture_output=True,
-            check=True,  # raise an exception on non-zero return codes
-        )
-        if verbose:
-            _logger.info(result.stdout)
-        return result.stdout
-    except subprocess.CalledProcessError as err:
-        err_msg = (
-            f"Git command failed in {git_repo_dir}:{os.linesep}"
-            f"  Args: {' '.join(git_args)}{os.linesep}"
-            f"  Stdout: {err.stdout.strip()}{os.linesep}"
-            f"  Stderr: {err.stderr.strip()}"
-        )
-        if log_error:
-            _logger.error(err_msg)
-
-        raise RuntimeError(err_msg)
-
-
-def calculate_file_checksum(file_path: Path, buffer_size: int = 8192) -> str:
-    """
-    Calculate SHA-256 checksum of a file.
-
-    The function reads the file in chunks to efficiently handle large files
-    without loading them entirely into memory.
-
-    Args:
-        file_path: Path to the file to calculate checksum for
-        buffer_size: Size of chunks to read from file, in bytes
-
-    Returns:
-        Hexadecimal string representation of the file's SHA-256 checksum
-
-    Raises:
-        ValueError: If file_path doesn't exist or is not a file
-        RuntimeError: If file access fails or checksum calculation fails
-    """
-    # Input validation
-    if not file_path.exists():
-        raise ValueError(f"File does not exist: {file_path}")
-
-    if not file_path.is_file():
-        raise ValueError(f"Path is not a file: {file_path}")
-
-    try:
-        checksum_generator = hashlib.new("sha256")
-        with file_path.open("rb") as file:
-            while chunk := file.read(buffer_size):
-                checksum_generator.update(chunk)
-        return checksum_generator.hexdigest()
-    except Exception as err:
-        raise RuntimeError(
-            f"Checksum calculation failed for {file_path}: {err}"
-        ) from err
-
-
-T = TypeVar("T")
-
-
-def validate_dict_keys_match_dataclass(
-    data: Dict[str, Any], dataclass_type: Type[T]
-) -> bool:
-    """
-    Validate that a dictionary contains all required fields of a dataclass.
-
-    This function checks if all fields defined in the dataclass are present
-    in the dictionary. It does not validate field types or extra fields
-    in the dictionary.
-
-    Args:
-        data: Dictionary to validate
-        dataclass_type: Type of dataclass to compare against
-
-    Returns:
-        True if the dictionary keys exactly match the dataclass fields, False otherwise
-
-    Raises:
-        ValueError: If dataclass_type is not a dataclass
-    """
-    if not is_dataclass(dataclass_type):
-        return False
-
-    # Get all field names from the dataclass
-    dataclass_field_names = {field.name for field in fields(dataclass_type)}
-
-    # Check if all dataclass fields are present in the dictionary
-    if not dataclass_field_names.issubset(data.keys()):
-        return False
-
-    return True
+from __future__ import annotations
+
+import io
+import json
+import logging
+import mmap
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+import xxhash
+
+from crpatcher import _io_uring
+
+__all__ = [
+    "calculate_file_checksum",
+    "calculate_file_checksums_batch",
+    "chunk_paths",
+    "invalidate_checksum_cache",
+    "is_file_unchanged",
+    "load_checksum_cache",
+    "map_concurrently",
+    "read_files_batch",
+    "run_git",
+    "run_git_stream",
+    "save_checksum_cache",
+    "validate_dict_keys_match_dataclass",
+]
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def run_git(
+    git_repo_dir: Path,
+    git_args: List[str],
+    verbose: bool = False,
+    log_error: bool = True,
+    input_text: Optional[str] = None,
+    stdout_path: Optional[Path] = None,
+) -> str:
+    """
+    Run a git command in the specified repository.
+
+    Args:
+        git_repo_dir: Path to the git repository directory
+        git_args: List of git command arguments to execute
+        verbose: If True, print command output to logs
+        log_error: If True, log error messages when command fails
+        input_text: Optional text written to the command's stdin
+        stdout_path: Optional file that git writes its stdout to byte for
+            byte, instead of it being decoded and returned
+
+    Returns:
+        The stdout output of the git command as a string, empty when
+        stdout_path is given
+
+    Raises:
+        ValueError: If git_repo_dir doesn't exist or git_args is empty
+        RuntimeError: If the git command fails or returns non-zero exit code
+    """
+    cmd = _build_git_command(git_repo_dir, git_args)
+
+    try:
+        if stdout_path is not None:
+            with open(stdout_path, "wb") as stdout_file:
+                subprocess.run(
+                    cmd,
+                    cwd=git_repo_dir,
+                    input=input_text,
+                    text=True,
+                    stdout=stdout_file,
+                    stderr=subprocess.PIPE,
+                    check=True,  # raise an exception on non-zero return codes
+                )
+            return ""
+
+        result = subprocess.run(
+            cmd,
+            cwd=git_repo_dir,
+            input=input_text,
+            text=True,
+            capture_output=True,
+            check=True,  # raise an exception on non-zero return codes
+        )
+        if verbose:
+            _logger.info(result.stdout)
+        return result.stdout
+    except subprocess.CalledProcessError as err:
+        err_msg = (
+            f"Git command failed in {git_repo_dir}:{os.linesep}"
+            f"  Args: {' '.join(git_args)}{os.linesep}"
+            f"  Stdout: {(err.stdout or '').strip()}{os.linesep}"
+            f"  Stderr: {err.stderr.strip()}"
+        )
+        if log_error:
+            _logger.error(err_msg)
+
+        raise RuntimeError(err_msg)
+
+
+# Path of the git executable, looked up in PATH by the first git command
+_git_executable: Optional[str] = None
+
+
+def _build_git_command(git_repo_dir: Path, git_args: List[str]) -> List[str]:
+    global _git_executable
+
+    if not git_repo_dir.is_dir():
+        raise ValueError(f"Git repository directory does not exist: {git_repo_dir}")
+
+    if not git_args:
+        raise ValueError("Git arguments cannot be empty")
+
+    # Validate git installation, a failed lookup is retried by the next command
+    if _git_executable is None:
+        _git_executable = shutil.which("git")
+        if _git_executable is None:
+            raise ValueError("Git executable not found in PATH")
+
+    # Construct safe command list
+    return [_git_executable] + git_args
+
+
+# Total length of the paths given to one git command, well under the 32767
+# characters Windows allows on a command line
+_MAX_COMMAND_LINE_PATHS_LENGTH = 8000
+
+
+def chunk_paths(relative_paths: List[str]) -> Iterator[List[str]]:
+    """
+    Split paths into chunks that each fit on a git command line.
+
+    For git commands that cannot read their pathspecs from stdin.
+
+    Args:
+        relative_paths: Paths to split, in order
+
+    Returns:
+        Iterator over the chunks, in order
+    """
+    chunk: List[str] = []
+    chunk_length = 0
+    for relative_path in relative_paths:
+        if chunk and chunk_length + len(relative_path) > _MAX_COMMAND_LINE_PATHS_LENGTH:
+            yield chunk
+            chunk = []
+            chunk_length = 0
+        chunk.append(relative_path)
+        chunk_length += len(relative_path) + 1
+    if chunk:
+        yield chunk
+
+
+_STREAM_CHUNK_SIZE = 1 << 16  # 64 KiB
+
+
+def run_git_stream(
+    git_repo_dir: Path,
+    git_args: List[str],
+    separator: str = "\n",
+    log_error: bool = True,
+) -> Iterator[str]:
+    """
+    Run a git command in the specified repository, streaming its output.
+
+    Unlike run_git, the output is never held in memory as a whole, records
+    are yielded while git is still writing the rest.
+
+    Args:
+        git_repo_dir: Path to the git repository directory
+        git_args: List of git command arguments to execute
+        separator: What the records of the output end with, "\0" for -z output
+        log_error: If True, log error messages when command fails
+
+    Returns:
+        Iterator over the records of stdout, without their separator
+
+    Raises:
+        ValueError: If git_repo_dir doesn't exist or git_args is empty
+        RuntimeError: Once the output is exhausted, if the git command
+            returned a non-zero exit code
+    """
+    cmd = _build_git_command(git_repo_dir, git_args)
+
+    # stderr is only read at the end, a pipe could fill up and stall git
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(
+            cmd,
+            cwd=git_repo_dir,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            text=True,
+        )
+        try:
+            pending = ""
+            for chunk in iter(lambda: process.stdout.read(_STREAM_CHUNK_SIZE), ""):
+                records = (pending + chunk).split(separator)
+                pending = records.pop()
+                yield from records
+            if pending:
+                yield pending
+        finally:
+            # Closing stdout first ends git if the caller stopped reading early
+            process.stdout.close()
+            returncode = process.wait()
+
+        if returncode != 0:
+            stderr_file.seek(0)
+            err_msg = (
+                f"Git command failed in {git_repo_dir}:{os.linesep}"
+                f"  Args: {' '.join(git_args)}{os.linesep}"
+                f"  Stderr: {stderr_file.read().decode(errors='replace').strip()}"
+            )
+            if log_error:
+                _logger.error(err_msg)
+
+            raise RuntimeError(err_msg)
+
+
+# Hash used for all checksums, stored with persisted checksums
+_CHECKSUM_ALGORITHM = "xxh3_128"
+
+# Layout of persisted checksum entries, bumped when the cache key changes
+_CHECKSUM_CACHE_VERSION = 2
+
+# Files larger than this are hashed straight from an mmap of the file
+_MMAP_CHECKSUM_THRESHOLD = 1 << 20  # 1 MiB
+
+# Checksums keyed by (absolute path, st_mtime_ns, st_size, st_ino). Modifying a
+# file changes its key, so an outdated checksum can never be returned. The inode
+# catches files replaced by a rename, as editors and git do, within one mtime tick.
+_ChecksumCacheKey = Tuple[str, int, int, int]
+_CHECKSUM_CACHE: Dict[_ChecksumCacheKey, str] = {}
+# Checksums are calculated on several threads at once, every access to
+# _CHECKSUM_CACHE and _checksum_cache_changed holds this lock
+_CHECKSUM_CACHE_LOCK = threading.Lock()
+# Whether _CHECKSUM_CACHE differs from what was last loaded or saved
+_checksum_cache_changed = False
+
+
+def _get_checksum_cache_key(file_path: Path | str) -> _ChecksumCacheKey:
+    """
+    Stat a file once, both to validate it and to build its cache key.
+
+    Raises:
+        ValueError: If file_path doesn't exist or is not a file
+    """
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        raise ValueError(f"File does not exist: {file_path}") from None
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise ValueError(f"Path is not a file: {file_path}")
+    return (
+        os.path.abspath(file_path),
+        stat_result.st_mtime_ns,
+        stat_result.st_size,
+        stat_result.st_ino,
+    )
+
+
+def calculate_file_checksum(file_path: Path | str) -> str:
+    """
+    Calculate the xxh3-128 checksum of a file.
+
+    Small files are read from a raw file descriptor into a reused per-thread
+    buffer, usually in a single read() call. Files over 1 MiB are mapped into
+    memory and hashed in place, skipping the copy into user-space buffers.
+    The checksums only detect changed files, so a fast non-cryptographic
+    hash is enough: hashing is bound by memory bandwidth, not SHA rounds.
+
+    Checksums are memoized by path, modification time, size and inode, all
+    from the one stat that also validates the path, so hashing a file that
+    has not changed since the last call is just that stat.
+
+    Args:
+        file_path: Path to the file to calculate checksum for
+
+    Returns:
+        Hexadecimal string representation of the file's xxh3-128 checksum
+
+    Raises:
+        ValueError: If file_path doesn't exist or is not a file
+        RuntimeError: If file access fails or checksum calculation fails
+    """
+    global _checksum_cache_changed
+
+    # Validates the file as well
+    cache_key = _get_checksum_cache_key(file_path)
+
+    try:
+        with _CHECKSUM_CACHE_LOCK:
+            checksum = _CHECKSUM_CACHE.get(cache_key)
+        if checksum is None:
+            checksum = _calculate_file_checksum_uncached(file_path)
+            with _CHECKSUM_CACHE_LOCK:
+                _CHECKSUM_CACHE[cache_key] = checksum
+                _checksum_cache_changed = True
+        return checksum
+    except Exception as err:
+        raise RuntimeError(
+            f"Checksum calculation failed for {file_path}: {err}"
+        ) from err
+
+
+_CHECKSUM_OPEN_FLAGS = (
+    os.O_RDONLY | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+)
+# Skip the access time update on each read, only allowed on files we own
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
+# Not available on Windows
+_MADV_SEQUENTIAL: Optional[int] = getattr(mmap, "MADV_SEQUENTIAL", None)
+
+
+# One read buffer per checksum thread, reused instead of allocating a new
+# bytes object for every chunk of every file
+_READ_BUFFERS = threading.local()
+
+
+def _get_read_buffer() -> memoryview:
+    buffer = getattr(_READ_BUFFERS, "buffer", None)
+    if buffer is None:
+        buffer = memoryview(bytearray(_MMAP_CHECKSUM_THRESHOLD))
+        _READ_BUFFERS.buffer = buffer
+    return buffer
+
+
+def _open_for_checksum(file_path: Path | str) -> int:
+    if _O_NOATIME:
+        try:
+            return os.open(file_path, _CHECKSUM_OPEN_FLAGS | _O_NOATIME)
+        except PermissionError:
+            pass
+    return os.open(file_path, _CHECKSUM_OPEN_FLAGS)
+
+
+def _calculate_file_checksum_uncached(file_path: Path | str) -> str:
+    # Raw fd, no pathlib or buffered reader wrappers in the per-file path
+    fd = _open_for_checksum(file_path)
+    try:
+        # The whole file is read once front to back, let the kernel read ahead
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        checksum_generator = xxhash.xxh3_128()
+        size = os.fstat(fd).st_size
+        if size <= _MMAP_CHECKSUM_THRESHOLD:
+            # Read up to the stat size into one buffer and hash it in a single
+            # update, usually one read() and without the one that only sees EOF
+            buffer = _get_read_buffer()
+            offset = 0
+            with io.FileIO(fd, closefd=False) as file:
+                while offset < size and (
+                    read_count := file.readinto(buffer[offset:size])
+                ):
+                    offset += read_count
+            checksum_generator.update(buffer[:offset])
+        else:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped:
+                # Page faults of the mapping follow madvise, not posix_fadvise
+                if _MADV_SEQUENTIAL is not None:
+                    mapped.madvise(_MADV_SEQUENTIAL)
+                checksum_generator.update(mapped)
+        return checksum_generator.hexdigest()
+    finally:
+        os.close(fd)
+
+
+# Setting up a ring costs more than the few reads of a smaller batch saves
+_IO_URING_MIN_BATCH_SIZE = 16
+
+# Marks the threads of _EXECUTOR, see map_concurrently
+_worker_state = threading.local()
+
+
+def _mark_worker_thread() -> None:
+    _worker_state.is_worker = True
+
+
+def _is_worker_thread() -> bool:
+    return getattr(_worker_state, "is_worker", False)
+
+
+# The one pool for every concurrent step. Work already running on it does its
+# own concurrent steps inline, so tasks never wait on tasks of the same pool
+# and the thread count stays bounded however the steps are nested.
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) + 4),
+    thread_name_prefix="crpatcher",
+    initializer=_mark_worker_thread,
+)
+
+
+def map_concurrently(function: Callable[..., T], *iterables: Iterable[Any]) -> List[T]:
+    """
+    Like map(), with the calls spread over the shared thread pool.
+
+    Meant for calls that mostly wait on git, stat or file reads. Called from
+    a thread of the pool, or with a single call to make, the calls run in
+    the calling thread instead, so nested uses never start more threads.
+
+    Args:
+        function: Function to call
+        *iterables: Arguments of the calls, as for map()
+
+    Returns:
+        The results in argument order
+
+    Raises:
+        Exception: The first exception, in argument order, raised by a call,
+            after all calls made on the pool have finished
+    """
+    args_list = list(zip(*iterables))
+    if len(args_list) <= 1 or _is_worker_thread():
+        return [function(*args) for args in args_list]
+    futures = [_EXECUTOR.submit(function, *args) for args in args_list]
+    wait(futures)
+    return [future.result() for future in futures]
+
+
+def calculate_file_checksums_batch(
+    file_paths: Sequence[Path | str],
+) -> Iterator[str]:
+    """
+    Calculate checksums of many files concurrently.
+
+    Files are hashed on the shared thread pool. xxhash releases the GIL while
+    hashing, so reading and hashing of different files overlap. Checksums
+    are yielded in the order of file_paths, and closing the iterator early
+    cancels the files that have not been started yet. Called from a thread
+    of the pool, as map_concurrently does, the files are hashed one by one.
+
+    With CRPATCHER_IO_URING=1 on Linux and liburing installed, batches of
+    at least 16 files are instead read through one io_uring up front,
+    falling back to the thread pool if the ring cannot be set up.
+
+    Args:
+        file_paths: Paths to the files to calculate checksums for
+
+    Returns:
+        Iterator over the hexadecimal checksums, one per file
+
+    Raises:
+        ValueError: As calculate_file_checksum, when reaching the failing file
+        RuntimeError: As calculate_file_checksum, when reaching the failing file
+    """
+    if len(file_paths) >= _IO_URING_MIN_BATCH_SIZE and _io_uring.is_enabled():
+        try:
+            results = _calculate_file_checksums_io_uring(file_paths)
+        except OSError as err:
+            _logger.info(f"io_uring unavailable, hashing on threads instead: {err}")
+        else:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+            return
+
+    if _is_worker_thread():
+        yield from map(calculate_file_checksum, file_paths)
+        return
+
+    checksums = _EXECUTOR.map(calculate_file_checksum, file_paths)
+    try:
+        yield from checksums
+    finally:
+        checksums.close()
+
+
+def _calculate_file_checksums_io_uring(
+    file_paths: Sequence[Path | str],
+) -> List[Union[str, Exception]]:
+    """
+    Calculate checksums of files not in the checksum cache through io_uring.
+
+    Errors are returned in place of the checksum so that the caller raises
+    them in the same order as calculate_file_checksum would.
+
+    Raises:
+        OSError: If the ring cannot be set up
+    """
+    global _checksum_cache_changed
+
+    results: List[Union[str, Exception]] = []
+    uncached_indices: List[int] = []
+    uncached_keys: List[_ChecksumCacheKey] = []
+    for index, file_path in enumerate(file_paths):
+        try:
+            cache_key = _get_checksum_cache_key(file_path)
+        except ValueError as err:
+            results.append(err)
+            continue
+
+        with _CHECKSUM_CACHE_LOCK:
+            checksum = _CHECKSUM_CACHE.get(cache_key)
+        results.append(checksum)
+        if checksum is None:
+            uncached_indices.append(index)
+            uncached_keys.append(cache_key)
+
+    if not uncached_indices:
+        return results
+
+    checksums = _io_uring.calculate_file_checksums(
+        [file_paths[index] for index in uncached_indices]
+    )
+    for index, cache_key, checksum in zip(uncached_indices, uncached_keys, checksums):
+        if isinstance(checksum, OSError):
+            results[index] = RuntimeError(
+                f"Checksum calculation failed for {file_paths[index]}: {checksum}"
+            )
+        else:
+            with _CHECKSUM_CACHE_LOCK:
+                _CHECKSUM_CACHE[cache_key] = checksum
+                _checksum_cache_changed = True
+            results[index] = checksum
+    return results
+
+
+def _read_file_or_none(file_path: Path | str) -> Optional[bytes]:
+    try:
+        with open(file_path, "rb") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def read_files_batch(file_paths: Sequence[Path | str]) -> List[Optional[bytes]]:
+    """
+    Read many small files concurrently.
+
+    Like calculate_file_checksums_batch, large enough batches are read
+    through one io_uring when enabled, others on the shared thread pool.
+
+    Args:
+        file_paths: Paths to the files to read
+
+    Returns:
+        The contents of each file in the order of file_paths, None for files
+        that could not be read, leaving the error to whoever opens them again
+    """
+    if len(file_paths) >= _IO_URING_MIN_BATCH_SIZE and _io_uring.is_enabled():
+        try:
+            results = _io_uring.read_files(file_paths)
+        except OSError as err:
+            _logger.info(f"io_uring unavailable, reading on threads instead: {err}")
+        else:
+            return [
+                None if isinstance(result, OSError) else result for result in results
+            ]
+
+    if _is_worker_thread():
+        return [_read_file_or_none(file_path) for file_path in file_paths]
+    return list(_EXECUTOR.map(_read_file_or_none, file_paths))
+
+
+def is_file_unchanged(
+    file_path: Path | str, mtime_ns: Optional[int], size: Optional[int]
+) -> bool:
+    """
+    Check whether a file still has a previously recorded modification time and size.
+
+    A stat is far cheaper than hashing the file again, callers that recorded
+    both values next to a checksum can skip recalculating it when they match.
+
+    Args:
+        file_path: Path to the file to check
+        mtime_ns: Recorded modification time in nanoseconds, or None if unknown
+        size: Recorded size in bytes, or None if unknown
+
+    Returns:
+        True if the file exists with the recorded values, False otherwise or
+        if either value is unknown
+    """
+    if mtime_ns is None or size is None:
+        return False
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        return False
+    return stat_result.st_mtime_ns == mtime_ns and stat_result.st_size == size
+
+
+def invalidate_checksum_cache(file_paths: Iterable[Path | str]) -> None:
+    """
+    Drop memoized checksums of files that were just rewritten.
+
+    File timestamps come from a coarse kernel clock, a file rewritten right
+    after being hashed can keep its mtime and size, so callers that modify
+    files invalidate them explicitly instead of relying on the cache key.
+
+    Args:
+        file_paths: Paths to the files to forget checksums of
+    """
+    global _checksum_cache_changed
+
+    abs_paths = {os.path.abspath(file_path) for file_path in file_paths}
+    if not abs_paths:
+        return
+    with _CHECKSUM_CACHE_LOCK:
+        for cache_key in [key for key in _CHECKSUM_CACHE if key[0] in abs_paths]:
+            del _CHECKSUM_CACHE[cache_key]
+            _checksum_cache_changed = True
+
+
+def load_checksum_cache(cache_file: Path) -> None:
+    """
+    Load checksums saved by save_checksum_cache() into the in-memory cache.
+
+    Entries whose file no longer exists or whose modification time or size
+    differ from the recorded ones are dropped. A missing or unreadable cache
+    file is not an error, the checksums are simply recalculated.
+
+    Args:
+        cache_file: Path to the cache file to load
+    """
+    global _checksum_cache_changed
+
+    if not cache_file.is_file():
+        return
+
+    try:
+        with cache_file.open("r", encoding="utf-8") as file:
+            data: Any = json.load(file)
+
+        # Checksums of another algorithm or entry layout, e.g. from an older
+        # version, are useless
+        if (
+            not isinstance(data, dict)
+            or data.get("algorithm") != _CHECKSUM_ALGORITHM
+            or data.get("version") != _CHECKSUM_CACHE_VERSION
+        ):
+            return
+
+        entries: List[List[Any]] = data["entries"]
+        loaded: Dict[_ChecksumCacheKey, str] = {}
+        for path, mtime_ns, size, ino, checksum in entries:
+            cache_key = (path, mtime_ns, size, ino)
+            try:
+                if _get_checksum_cache_key(path) == cache_key:
+                    loaded[cache_key] = checksum
+            except ValueError:
+                continue
+        with _CHECKSUM_CACHE_LOCK:
+            _CHECKSUM_CACHE.update(loaded)
+            # Dropped entries are only dropped from the file by a save
+            _checksum_cache_changed = len(loaded) != len(entries)
+    except Exception as err:
+        _logger.warning(f"Ignoring unreadable checksum cache {cache_file}: {err}")
+
+
+def save_checksum_cache(cache_file: Path) -> None:
+    """
+    Save the in-memory checksum cache so later runs can skip re-hashing.
+
+    Nothing is written when the cache is unchanged since it was loaded from
+    or saved to cache_file, as after a run that hashed nothing.
+
+    Args:
+        cache_file: Path where the cache file should be written, its parent
+            directories are created
+    """
+    global _checksum_cache_changed
+
+    with _CHECKSUM_CACHE_LOCK:
+        if not _checksum_cache_changed and cache_file.is_file():
+            return
+        entries = [
+            [path, mtime_ns, size, ino, checksum]
+            for (path, mtime_ns, size, ino), checksum in _CHECKSUM_CACHE.items()
+        ]
+        _checksum_cache_changed = False
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with cache_file.open("w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "algorithm": _CHECKSUM_ALGORITHM,
+                    "version": _CHECKSUM_CACHE_VERSION,
+                    "entries": entries,
+                },
+                file,
+            )
+    except Exception as err:
+        _logger.warning(f"Could not write checksum cache {cache_file}: {err}")
+
+
+def validate_dict_keys_match_dataclass(
+    data: Dict[str, Any], dataclass_type: Type[T]
+) -> bool:
+    """
+    Validate that a dictionary contains all required fields of a dataclass.
+
+    This function checks if all fields defined in the dataclass are present
+    in the dictionary. It does not validate field types or extra fields
+    in the dictionary.
+
+    Args:
+        data: Dictionary to validate
+        dataclass_type: Type of dataclass to compare against
+
+    Returns:
+        True if the dictionary keys exactly match the dataclass fields, False otherwise
+
+    Raises:
+        ValueError: If dataclass_type is not a dataclass
+    """
+    if not is_dataclass(dataclass_type):
+        return False
+
+    # Get all field names from the dataclass
+    dataclass_field_names = {field.name for field in fields(dataclass_type)}
+
+    # Check if all dataclass fields are present in the dictionary
+    if not dataclass_field_names.issubset(data.keys()):
+        return False
+
+    return True
@@ -73,13 +73,35 @@ def test_load_with_defaults(config_file: Path) -> None:
     assert config.repo_dirs == ["one_level_dir", "two/level_dir", "three/level/dir"]
 
     # Check default values
-    assert config.patchinfo_file_schema_version == 1
+    assert config.patchinfo_file_schema_version == 2
     assert config.patchinfo_file_encoding == "utf-8"
     assert config.patchinfo_file_ext == "patchinfo"
     assert config.patch_file_ext == "patch"
     assert config.patch_file_replacement_separator == "-"
 
 
+def test_resolved_repo_mappings(config_file: Path) -> None:
+    """Test repo_dirs are resolved against chromium_src_dir and patches_dir."""
+    config = ProgramConfig.load(config_file)
+
+    assert config.resolved_repo_mappings == (
+        (Path("src/one_level_dir"), Path("patches/one_level_dir")),
+        (Path("src/two/level_dir"), Path("patches/two/level_dir")),
+        (Path("src/three/level/dir"), Path("patches/three/level/dir")),
+    )
+
+
+def test_repo_dirs_display(config_file: Path) -> None:
+    """Test each repo dir is listed on its own line."""
+    config = ProgramConfig.load(config_file)
+
+    assert config.repo_dirs_display == (
+        f"  - one_level_dir{os.linesep}"
+        f"  - two/level_dir{os.linesep}"
+        f"  - three/level/dir{os.linesep}"
+    )
+
+
 def test_load_nonexistent_file() -> None:
     """Test loading a nonexistent config file."""
     with pytest.raises(FileNotFoundError):
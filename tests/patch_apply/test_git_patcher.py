@@ -0,0 +1,292 @@
+# Copyright 2025 Phi-Long Le. All rights reserved.
+# Use of this source code is governed by a MIT license that can be
+# found in the LICENSE file.
+
+import os
+import subprocess
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from crpatcher.config import ProgramConfig
+from crpatcher.patch_apply import (
+    AffectedFileData,
+    GitPatcher,
+    PatchInfo,
+    PatchInfoStaleStatus,
+    RepoWorktreeState,
+)
+from crpatcher.patch_apply.git_patcher import _count_diff_sections, _parse_numstat_paths
+
+
+@pytest.mark.parametrize(
+    "output, expected_paths",
+    [
+        ("", []),
+        ("1\t1\tbase/file.cc\0", ["base/file.cc"]),
+        ("1\t1\ta.cc\x003\t0\tdir with space/b.cc\0", ["a.cc", "dir with space/b.cc"]),
+        (
+            "0\t0\t\0old/name.cc\0new/name.cc\0-\t-\timage.png\0",
+            ["new/name.cc", "image.png"],
+        ),
+    ],
+)
+def test_parse_numstat_paths(output: str, expected_paths: List[str]) -> None:
+    """Test paths are extracted from `git apply --numstat -z` records."""
+    assert _parse_numstat_paths(output.split("\0")) == expected_paths
+
+
+@pytest.mark.parametrize(
+    "patch_contents, expected_count",
+    [
+        (b"", 0),
+        (b"diff --git a/a.cc b/a.cc\n--- a/a.cc\n+++ b/a.cc\n", 1),
+        (b"diff --git a/a.cc b/a.cc\n-diff --git x\ndiff --git a/b.cc b/b.cc\n", 2),
+    ],
+)
+def test_count_diff_sections(patch_contents: bytes, expected_count: int) -> None:
+    """Test file sections are counted by their `diff --git` headers only."""
+    assert _count_diff_sections(patch_contents) == expected_count
+
+
+@pytest.fixture
+def repo_dir(tmp_path: Path) -> Path:
+    """Create a git repository with one committed file."""
+    repo_dir = tmp_path / "src"
+    repo_dir.mkdir()
+    repo_dir.joinpath("file.txt").write_bytes(b"a b\ntwo\n")
+    for git_args in (
+        ["init", "-q"],
+        ["add", "file.txt"],
+        ["-c", "user.name=test", "-c", "user.email=test@test", "commit", "-qm", "init"],
+    ):
+        subprocess.run(["git"] + git_args, cwd=repo_dir, check=True)
+    return repo_dir
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> ProgramConfig:
+    """Create a config with patches next to the repository."""
+    return ProgramConfig(
+        chromium_src_dir=tmp_path, patches_dir=tmp_path, repo_dirs=["src"]
+    )
+
+
+@pytest.mark.parametrize(
+    "patch_contents",
+    [
+        b"@@ -1,2 +1,2 @@\n a b\n-two\n+TWO\n",
+        # Context with more spaces only applies with --ignore-space-change
+        b"@@ -1,2 +1,2 @@\n a  b\n-two\n+TWO\n",
+    ],
+    ids=["exact", "whitespace"],
+)
+def test_libgit2_apply_and_reset(
+    tmp_path: Path, repo_dir: Path, config: ProgramConfig, patch_contents: bytes
+) -> None:
+    """Test patches apply and files reset in-process, falling back to git apply."""
+    pytest.importorskip("pygit2")
+    patch_file = tmp_path / "file.txt.patch"
+    patch_file.write_bytes(
+        b"diff --git a/file.txt b/file.txt\n--- a/file.txt\n+++ b/file.txt\n"
+        + patch_contents
+    )
+    patcher = GitPatcher(patch_dir=tmp_path, git_repo_dir=repo_dir, config=config)
+    assert patcher._libgit2_repo is not None
+
+    patcher.apply_patch_files([patch_file])
+    assert repo_dir.joinpath("file.txt").read_bytes() == b"a b\nTWO\n"
+
+    patcher.reset_files_in_repo(["file.txt"])
+    assert repo_dir.joinpath("file.txt").read_bytes() == b"a b\ntwo\n"
+
+
+def test_handle_obsolete_patchinfos(
+    tmp_path: Path, repo_dir: Path, config: ProgramConfig
+) -> None:
+    """Test files of removed patches are reset and their .patchinfo files removed."""
+    repo_dir.joinpath("file.txt").write_bytes(b"patched\n")
+    patchinfo_file = tmp_path / "file.txt.patchinfo"
+    PatchInfo(
+        schema_version=config.patchinfo_file_schema_version,
+        patch_checksum=None,
+        affected_files=[AffectedFileData("file.txt", None)],
+    ).write(patchinfo_file, config)
+    unreadable_patchinfo_file = tmp_path / "other.txt.patchinfo"
+    unreadable_patchinfo_file.write_text("not json")
+
+    patcher = GitPatcher(patch_dir=tmp_path, git_repo_dir=repo_dir, config=config)
+    result = patcher.handle_obsolete_patchinfos(
+        [patchinfo_file, unreadable_patchinfo_file]
+    )
+
+    assert [(r.file_path, r.patch_path) for r in result] == [
+        (repo_dir / "file.txt", tmp_path / "file.txt.patch")
+    ]
+    assert repo_dir.joinpath("file.txt").read_bytes() == b"a b\ntwo\n"
+    assert not patchinfo_file.exists()
+    assert unreadable_patchinfo_file.exists()
+
+
+def _git(repo_dir: Path, *git_args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@test"] + list(git_args),
+        cwd=repo_dir,
+        check=True,
+    )
+
+
+def _write_patch(patch_dir: Path, relative_path: str, contents: bytes) -> Path:
+    patch_dir.mkdir(exist_ok=True)
+    patch_file = patch_dir / (relative_path.replace("/", "-") + ".patch")
+    patch_file.write_bytes(
+        f"diff --git a/{relative_path} b/{relative_path}\n".encode() + contents
+    )
+    return patch_file
+
+
+def _get_stale_status(
+    patcher: GitPatcher, repo_dir: Path, patch_file: Path, config: ProgramConfig
+) -> PatchInfoStaleStatus:
+    return PatchInfo.get_stale_status(
+        repo_dir=repo_dir,
+        patch_file=patch_file,
+        patchinfo_file=patch_file.with_suffix(".patchinfo"),
+        config=config,
+        worktree_state=patcher.get_worktree_state(),
+    )
+
+
+def test_reverted_file_is_stale(
+    tmp_path: Path, repo_dir: Path, config: ProgramConfig
+) -> None:
+    """Test a patched file restored from git needs the patch again."""
+    patch_dir = tmp_path / "patches"
+    patch_file = _write_patch(
+        patch_dir,
+        "file.txt",
+        b"--- a/file.txt\n+++ b/file.txt\n@@ -1,2 +1,2 @@\n a b\n-two\n+TWO more\n",
+    )
+    patcher = GitPatcher(patch_dir=patch_dir, git_repo_dir=repo_dir, config=config)
+    assert [r.error for r in patcher.apply_patches()] == [None]
+    assert _get_stale_status(patcher, repo_dir, patch_file, config) == (
+        PatchInfoStaleStatus.NONE
+    )
+
+    _git(repo_dir, "checkout", "--", "file.txt")
+    assert _get_stale_status(patcher, repo_dir, patch_file, config) == (
+        PatchInfoStaleStatus.SRC_CHANGED
+    )
+
+
+@pytest.mark.parametrize("flag", ["--assume-unchanged", "--skip-worktree"])
+def test_flagged_file_is_not_reset(
+    tmp_path: Path, repo_dir: Path, config: ProgramConfig, flag: str
+) -> None:
+    """Test files git status does not look at are hashed instead of reset."""
+    patch_dir = tmp_path / "patches"
+    patch_file = _write_patch(
+        patch_dir,
+        "file.txt",
+        b"--- a/file.txt\n+++ b/file.txt\n@@ -1,2 +1,2 @@\n a b\n-two\n+TWO more\n",
+    )
+    patcher = GitPatcher(patch_dir=patch_dir, git_repo_dir=repo_dir, config=config)
+    assert [r.error for r in patcher.apply_patches()] == [None]
+
+    _git(repo_dir, "update-index", flag, "file.txt")
+    # Same content with another mtime, git status leaves the file out
+    stat_result = repo_dir.joinpath("file.txt").stat()
+    os.utime(
+        repo_dir / "file.txt",
+        ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9),
+    )
+    assert _get_stale_status(patcher, repo_dir, patch_file, config) == (
+        PatchInfoStaleStatus.NONE
+    )
+
+
+def test_unchanged_files_skip_git(
+    tmp_path: Path, repo_dir: Path, config: ProgramConfig
+) -> None:
+    """Test git is not asked about the worktree when no file stat changed."""
+    patch_dir = tmp_path / "patches"
+    patch_file = _write_patch(
+        patch_dir,
+        "file.txt",
+        b"--- a/file.txt\n+++ b/file.txt\n@@ -1,2 +1,2 @@\n a b\n-two\n+TWO more\n",
+    )
+    patcher = GitPatcher(patch_dir=patch_dir, git_repo_dir=repo_dir, config=config)
+    assert [r.error for r in patcher.apply_patches()] == [None]
+
+    def get_head_sha() -> str:
+        raise AssertionError("HEAD was read")
+
+    assert (
+        PatchInfo.get_stale_status(
+            repo_dir=repo_dir,
+            patch_file=patch_file,
+            patchinfo_file=patch_file.with_suffix(".patchinfo"),
+            config=config,
+            worktree_state=RepoWorktreeState(repo_dir, get_head_sha),
+        )
+        == PatchInfoStaleStatus.NONE
+    )
+
+
+def test_new_ignored_file_is_not_stale(
+    tmp_path: Path, repo_dir: Path, config: ProgramConfig
+) -> None:
+    """Test a patch adding a file git ignores is not applied again."""
+    repo_dir.joinpath(".gitignore").write_text("out/\n")
+    _git(repo_dir, "add", ".gitignore")
+    _git(repo_dir, "commit", "-qm", "ignore out")
+    patch_dir = tmp_path / "patches"
+    patch_file = _write_patch(
+        patch_dir,
+        "out/gen.txt",
+        b"new file mode 100644\n--- /dev/null\n+++ b/out/gen.txt\n"
+        b"@@ -0,0 +1 @@\n+gen\n",
+    )
+    patcher = GitPatcher(patch_dir=patch_dir, git_repo_dir=repo_dir, config=config)
+    assert [r.error for r in patcher.apply_patches()] == [None]
+    assert repo_dir.joinpath("out/gen.txt").read_bytes() == b"gen\n"
+
+    assert _get_stale_status(patcher, repo_dir, patch_file, config) == (
+        PatchInfoStaleStatus.NONE
+    )
+    assert patcher.apply_patches() == []
+
+
+def test_failing_patch_among_several(
+    tmp_path: Path, repo_dir: Path, config: ProgramConfig
+) -> None:
+    """Test patches that apply still do, with .patchinfo, when another one fails."""
+    for name in ("a.txt", "b.txt"):
+        repo_dir.joinpath(name).write_bytes(b"one\n")
+    _git(repo_dir, "add", "a.txt", "b.txt")
+    _git(repo_dir, "commit", "-qm", "add files")
+    patch_dir = tmp_path / "patches"
+    for name in ("a.txt", "b.txt"):
+        _write_patch(
+            patch_dir,
+            name,
+            f"--- a/{name}\n+++ b/{name}\n@@ -1 +1 @@\n-one\n+ONE\n".encode(),
+        )
+    _write_patch(
+        patch_dir,
+        "file.txt",
+        b"--- a/file.txt\n+++ b/file.txt\n@@ -1,2 +1,2 @@\n a b\n-other\n+OTHER\n",
+    )
+
+    patcher = GitPatcher(patch_dir=patch_dir, git_repo_dir=repo_dir, config=config)
+    errors = {r.patch_path.name: r.error for r in patcher.apply_patches()}
+
+    assert errors["a.txt.patch"] is None
+    assert errors["b.txt.patch"] is None
+    assert errors["file.txt.patch"] is not None
+    for name in ("a.txt", "b.txt"):
+        assert repo_dir.joinpath(name).read_bytes() == b"ONE\n"
+        assert patch_dir.joinpath(f"{name}.patchinfo").is_file()
+    assert repo_dir.joinpath("file.txt").read_bytes() == b"a b\ntwo\n"
+    assert not patch_dir.joinpath("file.txt.patchinfo").exists()
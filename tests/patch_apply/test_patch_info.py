@@ -0,0 +1,231 @@
+# Copyright 2025 Phi-Long Le. All rights reserved.
+# Use of this source code is governed by a MIT license that can be
+# found in the LICENSE file.
+
+import os
+from pathlib import Path
+
+import pytest
+
+from crpatcher.config import ProgramConfig
+from crpatcher.patch_apply import AffectedFileData, PatchInfo, PatchInfoStaleStatus
+from crpatcher.util import calculate_file_checksum
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> ProgramConfig:
+    """Create a config with default file settings."""
+    return ProgramConfig(
+        chromium_src_dir=tmp_path / "src",
+        patches_dir=tmp_path / "patches",
+        repo_dirs=[],
+    )
+
+
+@pytest.fixture
+def repo_dir(tmp_path: Path) -> Path:
+    """Create a repository directory with a patched file."""
+    repo_dir = tmp_path / "src"
+    repo_dir.mkdir()
+    repo_dir.joinpath("file.cc").write_text("patched")
+    return repo_dir
+
+
+@pytest.fixture
+def patch_file(tmp_path: Path) -> Path:
+    """Create a .patch file."""
+    patch_file = tmp_path / "file.cc.patch"
+    patch_file.write_text("diff")
+    return patch_file
+
+
+@pytest.fixture
+def patchinfo_file(repo_dir: Path, patch_file: Path, config: ProgramConfig) -> Path:
+    """Create a .patchinfo file matching repo_dir and patch_file."""
+    patchinfo_file = patch_file.with_suffix(".patchinfo")
+    PatchInfo(
+        schema_version=config.patchinfo_file_schema_version,
+        patch_checksum=calculate_file_checksum(patch_file),
+        affected_files=[
+            AffectedFileData(
+                file_relative_path="file.cc",
+                file_checksum=calculate_file_checksum(repo_dir / "file.cc"),
+            )
+        ],
+    ).write(patchinfo_file, config)
+    return patchinfo_file
+
+
+def test_write_and_parse(tmp_path: Path, config: ProgramConfig) -> None:
+    """Test a written .patchinfo file parses back to the same data."""
+    patchinfo = PatchInfo(
+        schema_version=1,
+        patch_checksum="abc",
+        affected_files=[
+            AffectedFileData("a/b.cc", "def", file_mtime_ns=1, file_size=2),
+            AffectedFileData("c", None),
+        ],
+        repo_head_sha="123",
+        patch_file_mtime_ns=3,
+        patch_file_size=4,
+    )
+    patchinfo_file = tmp_path / "test.patchinfo"
+    patchinfo.write(patchinfo_file, config)
+
+    assert PatchInfo.parse(patchinfo_file, config) == patchinfo
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "UTF8", "ascii", "latin-1"])
+def test_write_and_parse_non_ascii_path(tmp_path: Path, encoding: str) -> None:
+    """Test non-ASCII paths round-trip in every configured encoding."""
+    config = ProgramConfig(
+        chromium_src_dir=tmp_path / "src",
+        patches_dir=tmp_path / "patches",
+        repo_dirs=[],
+        patchinfo_file_encoding=encoding,
+    )
+    patchinfo = PatchInfo(
+        schema_version=1,
+        patch_checksum="abc",
+        affected_files=[AffectedFileData("d\u00fcr/\u6587\u4ef6.cc", "def")],
+    )
+    patchinfo_file = tmp_path / "test.patchinfo"
+    patchinfo.write(patchinfo_file, config)
+
+    assert PatchInfo.parse(patchinfo_file, config) == patchinfo
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '{"schema_version": "1", "affected_files": []}',
+        '{"schema_version": true, "patch_checksum": null, "affected_files": []}',
+        '{"schema_version": 1, "patch_checksum": null, "affected_files": [{}]}',
+        '{"schema_version": 1, "patch_checksum": null, "affected_files": [],'
+        ' "patch_file_size": "1"}',
+    ],
+)
+def test_parse_invalid_schema(
+    tmp_path: Path, config: ProgramConfig, content: str
+) -> None:
+    """Test parsing a .patchinfo file that fails schema validation."""
+    patchinfo_file = tmp_path / "test.patchinfo"
+    patchinfo_file.write_text(content)
+
+    with pytest.raises(TypeError):
+        PatchInfo.parse(patchinfo_file, config)
+
+
+def test_stale_status_none(
+    repo_dir: Path, patch_file: Path, patchinfo_file: Path, config: ProgramConfig
+) -> None:
+    """Test nothing is stale right after writing the .patchinfo file."""
+    status = PatchInfo.get_stale_status(repo_dir, patch_file, patchinfo_file, config)
+    assert status == PatchInfoStaleStatus.NONE
+
+
+def test_stale_status_preloaded_patchinfo(
+    repo_dir: Path, patch_file: Path, patchinfo_file: Path, config: ProgramConfig
+) -> None:
+    """Test preloaded .patchinfo contents are used instead of the file."""
+    contents = patchinfo_file.read_bytes()
+    patchinfo_file.unlink()
+
+    status = PatchInfo.get_stale_status(
+        repo_dir, patch_file, patchinfo_file, config, patchinfo_contents=contents
+    )
+    assert status == PatchInfoStaleStatus.NONE
+
+
+def test_stale_status_no_patchinfo(
+    repo_dir: Path, patch_file: Path, config: ProgramConfig
+) -> None:
+    """Test a missing .patchinfo file."""
+    status = PatchInfo.get_stale_status(
+        repo_dir, patch_file, patch_file.with_suffix(".patchinfo"), config
+    )
+    assert status == PatchInfoStaleStatus.NO_PATCHINFO
+
+
+def test_stale_status_patch_changed(
+    repo_dir: Path, patch_file: Path, patchinfo_file: Path, config: ProgramConfig
+) -> None:
+    """Test a modified .patch file."""
+    patch_file.write_text("new diff")
+
+    status = PatchInfo.get_stale_status(repo_dir, patch_file, patchinfo_file, config)
+    assert status == PatchInfoStaleStatus.PATCH_CHANGED
+
+
+def test_stale_status_src_changed(
+    repo_dir: Path, patch_file: Path, patchinfo_file: Path, config: ProgramConfig
+) -> None:
+    """Test a modified affected file."""
+    repo_dir.joinpath("file.cc").write_text("reset")
+
+    status = PatchInfo.get_stale_status(repo_dir, patch_file, patchinfo_file, config)
+    assert status == PatchInfoStaleStatus.SRC_CHANGED
+
+
+def test_stale_status_src_removed(
+    repo_dir: Path, patch_file: Path, patchinfo_file: Path, config: ProgramConfig
+) -> None:
+    """Test a removed affected file."""
+    repo_dir.joinpath("file.cc").unlink()
+
+    status = PatchInfo.get_stale_status(repo_dir, patch_file, patchinfo_file, config)
+    assert status == PatchInfoStaleStatus.SRC_CHANGED
+
+
+def _write_patchinfo_with_stats(
+    repo_dir: Path, patch_file: Path, config: ProgramConfig, checksum: str
+) -> Path:
+    """Write a .patchinfo file recording the current stats and the given checksum."""
+    patchinfo_file = patch_file.with_suffix(".patchinfo")
+    patch_stat = patch_file.stat()
+    file_stat = repo_dir.joinpath("file.cc").stat()
+    PatchInfo(
+        schema_version=config.patchinfo_file_schema_version,
+        patch_checksum=checksum,
+        affected_files=[
+            AffectedFileData(
+                file_relative_path="file.cc",
+                file_checksum=checksum,
+                file_mtime_ns=file_stat.st_mtime_ns,
+                file_size=file_stat.st_size,
+            )
+        ],
+        patch_file_mtime_ns=patch_stat.st_mtime_ns,
+        patch_file_size=patch_stat.st_size,
+    ).write(patchinfo_file, config)
+    return patchinfo_file
+
+
+def test_stale_status_stat_match_skips_checksum(
+    repo_dir: Path, patch_file: Path, config: ProgramConfig
+) -> None:
+    """Test files with the recorded mtime and size are not hashed again."""
+    patchinfo_file = _write_patchinfo_with_stats(
+        repo_dir, patch_file, config, checksum="not hashed"
+    )
+
+    status = PatchInfo.get_stale_status(repo_dir, patch_file, patchinfo_file, config)
+    assert status == PatchInfoStaleStatus.NONE
+
+
+def test_stale_status_stat_mismatch_checks_checksum(
+    repo_dir: Path, patch_file: Path, config: ProgramConfig
+) -> None:
+    """Test a file with a different mtime falls back to its checksum."""
+    patchinfo_file = _write_patchinfo_with_stats(
+        repo_dir, patch_file, config, checksum=calculate_file_checksum(patch_file)
+    )
+    affected_file = repo_dir.joinpath("file.cc")
+    affected_stat = affected_file.stat()
+    affected_file.write_text("resets")
+    os.utime(
+        affected_file, ns=(affected_stat.st_atime_ns, affected_stat.st_mtime_ns + 1)
+    )
+
+    status = PatchInfo.get_stale_status(repo_dir, patch_file, patchinfo_file, config)
+    assert status == PatchInfoStaleStatus.SRC_CHANGED
@@ -0,0 +1,164 @@
+# Copyright 2025 Phi-Long Le. All rights reserved.
+# Use of this source code is governed by a MIT license that can be
+# found in the LICENSE file.
+
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from crpatcher.config import ProgramConfig
+from crpatcher.patch_generator.git_patch_generator import (
+    GitPatchGenerator,
+    _split_diff_by_path,
+)
+
+_SECTION_A = b"diff --git a/a.cc b/a.cc\n--- a/a.cc\n+++ b/a.cc\n-diff --git x\n"
+_SECTION_B = b"diff --git a/dir b/b c.cc b/dir b/b c.cc\n+b\n"
+
+
+@pytest.mark.parametrize(
+    "diff_output, expected_sections",
+    [
+        (b"", {}),
+        (_SECTION_A + _SECTION_B, {"a.cc": _SECTION_A, "dir b/b c.cc": _SECTION_B}),
+        (
+            b'diff --git "a/\\303\\274.cc" "b/\\303\\274.cc"\n+u\n' + _SECTION_A,
+            {"a.cc": _SECTION_A},
+        ),
+    ],
+)
+def test_split_diff_by_path(
+    diff_output: bytes, expected_sections: Dict[str, bytes]
+) -> None:
+    """Test diff output is split by file header, quoted paths are left out."""
+    sections = _split_diff_by_path(diff_output)
+    assert {
+        path: diff_output[start:end] for path, (start, end) in sections.items()
+    } == expected_sections
+
+
+def _make_modified_repo(repo_dir: Path, relative_paths: List[str]) -> None:
+    for relative_path in relative_paths:
+        repo_dir.joinpath(relative_path).parent.mkdir(parents=True, exist_ok=True)
+        repo_dir.joinpath(relative_path).write_text("one\ntwo\n")
+    for git_args in (
+        ["init", "-q"],
+        ["add", "-A"],
+        ["-c", "user.name=test", "-c", "user.email=test@test", "commit", "-qm", "init"],
+    ):
+        subprocess.run(["git"] + git_args, cwd=repo_dir, check=True)
+    for relative_path in relative_paths:
+        repo_dir.joinpath(relative_path).write_text("one\nTWO\n")
+
+
+def _assert_patch_files(
+    repo_dir: Path,
+    patch_dir: Path,
+    relative_paths: List[str],
+    patch_filenames: List[str],
+) -> None:
+    for relative_path, patch_filename in zip(relative_paths, patch_filenames):
+        expected_contents = subprocess.run(
+            ["git", "diff", "--src-prefix=a/", "--dst-prefix=b/", "--full-index"]
+            + [relative_path],
+            cwd=repo_dir,
+            check=True,
+            capture_output=True,
+        ).stdout
+        assert expected_contents
+        assert patch_dir.joinpath(patch_filename).read_bytes() == expected_contents
+
+
+def test_write_patch_files(tmp_path: Path) -> None:
+    """Test batched patches match diffing each file on its own."""
+    repo_dir = tmp_path / "src"
+    relative_paths = ["a.txt", "dir with space/b c.txt", "x b/x b"]
+    _make_modified_repo(repo_dir, relative_paths)
+
+    patch_dir = tmp_path / "patches"
+    config = ProgramConfig(
+        chromium_src_dir=tmp_path, patches_dir=patch_dir, repo_dirs=["src"]
+    )
+    generator = GitPatchGenerator(repo_dir, patch_dir, config)
+    patch_filenames = generator.write_patch_files(relative_paths)
+
+    _assert_patch_files(repo_dir, patch_dir, relative_paths, patch_filenames)
+
+
+def test_write_modified_patch_files(tmp_path: Path) -> None:
+    """Test patches split from a single diff match diffing each file on its own."""
+    repo_dir = tmp_path / "src"
+    relative_paths = ["a.txt", "dir with space/b c.txt", "ignored.txt"]
+    _make_modified_repo(repo_dir, relative_paths)
+
+    patch_dir = tmp_path / "patches"
+    config = ProgramConfig(
+        chromium_src_dir=tmp_path, patches_dir=patch_dir, repo_dirs=["src"]
+    )
+    generator = GitPatchGenerator(
+        repo_dir,
+        patch_dir,
+        config,
+        relative_paths_to_ignore=lambda path: path != "ignored.txt",
+    )
+    patch_filenames = generator.write_modified_patch_files()
+
+    kept_paths = ["a.txt", "dir with space/b c.txt"]
+    assert patch_filenames == [
+        "a.txt.patch",
+        "dir with space-b c.txt.patch",
+    ]
+    _assert_patch_files(repo_dir, patch_dir, kept_paths, patch_filenames)
+
+    # git quotes this path, so the caller has to diff files one by one
+    _make_modified_repo(tmp_path / "quoted", ["\u00fc.txt"])
+    generator = GitPatchGenerator(tmp_path / "quoted", patch_dir, config)
+    assert generator.write_modified_patch_files() is None
+
+
+def test_remove_stale_patch_files(tmp_path: Path) -> None:
+    """Test only .patch files that are neither generated nor kept are removed."""
+    patch_dir = tmp_path / "patches"
+    patch_dir.mkdir()
+    for filename in ["new.patch", "kept.patch", "stale.patch", "stale.patchinfo"]:
+        patch_dir.joinpath(filename).write_text("")
+    patch_dir.joinpath("dir.patch").mkdir()
+
+    config = ProgramConfig(
+        chromium_src_dir=tmp_path, patches_dir=patch_dir, repo_dirs=["src"]
+    )
+    generator = GitPatchGenerator(
+        tmp_path, patch_dir, config, patch_files_to_keep=["kept.patch"]
+    )
+    generator.remove_stale_patch_files(["new.patch"])
+
+    assert sorted(path.name for path in patch_dir.iterdir()) == [
+        "dir.patch",
+        "kept.patch",
+        "new.patch",
+        "stale.patchinfo",
+    ]
+
+
+def test_remove_stale_patch_files_custom_ext(tmp_path: Path) -> None:
+    """Test stale files are matched by the configured patch file extension."""
+    patch_dir = tmp_path / "patches"
+    patch_dir.mkdir()
+    for filename in ["new.diff", "stale.diff", "other.patch"]:
+        patch_dir.joinpath(filename).write_text("")
+
+    config = ProgramConfig(
+        chromium_src_dir=tmp_path,
+        patches_dir=patch_dir,
+        repo_dirs=["src"],
+        patch_file_ext="diff",
+    )
+    generator = GitPatchGenerator(tmp_path, patch_dir, config)
+    generator.remove_stale_patch_files(["new.diff"])
+
+    assert sorted(path.name for path in patch_dir.iterdir()) == [
+        "new.diff",
+        "other.patch",
+    ]
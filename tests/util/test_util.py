@@ -0,0 +1,373 @@
+# Copyright 2025 Phi-Long Le. All rights reserved.
+# Use of this source code is governed by a MIT license that can be
+# found in the LICENSE file.
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+import xxhash
+
+from crpatcher import util
+from crpatcher.util import (
+    calculate_file_checksum,
+    calculate_file_checksums_batch,
+    invalidate_checksum_cache,
+    is_file_unchanged,
+    load_checksum_cache,
+    map_concurrently,
+    read_files_batch,
+    run_git_stream,
+    save_checksum_cache,
+)
+
+
+def _checksum(content: bytes) -> str:
+    return xxhash.xxh3_128(content).hexdigest()
+
+
+@pytest.mark.parametrize("size", [0, 1, 8192, (1 << 20) + 1])
+def test_calculate_file_checksum(tmp_path: Path, size: int) -> None:
+    """Test checksums match xxh3-128 of the contents for files around the mmap threshold."""
+    content = bytes(i % 251 for i in range(size))
+    file_path = tmp_path / "file.bin"
+    file_path.write_bytes(content)
+
+    assert calculate_file_checksum(file_path) == _checksum(content)
+
+
+def test_calculate_file_checksum_missing_file(tmp_path: Path) -> None:
+    """Test checksum of a nonexistent file."""
+    with pytest.raises(ValueError):
+        calculate_file_checksum(tmp_path / "missing")
+
+
+def test_calculate_file_checksum_directory(tmp_path: Path) -> None:
+    """Test checksum of a directory."""
+    with pytest.raises(ValueError):
+        calculate_file_checksum(tmp_path)
+
+
+def test_calculate_file_checksum_after_modification(tmp_path: Path) -> None:
+    """Test a cached checksum is not reused once the file changes."""
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"before")
+    assert calculate_file_checksum(file_path) == _checksum(b"before")
+
+    file_path.write_bytes(b"after!!")
+    assert calculate_file_checksum(file_path) == _checksum(b"after!!")
+
+
+def test_save_and_load_checksum_cache(tmp_path: Path) -> None:
+    """Test checksums survive a save/load round trip and stale ones are dropped."""
+    unchanged_file = tmp_path / "unchanged.txt"
+    unchanged_file.write_bytes(b"unchanged")
+    changed_file = tmp_path / "changed.txt"
+    changed_file.write_bytes(b"changed")
+    calculate_file_checksum(unchanged_file)
+    calculate_file_checksum(changed_file)
+
+    cache_file = tmp_path / "cache.json"
+    save_checksum_cache(cache_file)
+    util._CHECKSUM_CACHE.clear()
+
+    changed_file.write_bytes(b"changed again")
+    load_checksum_cache(cache_file)
+
+    cached_paths = {cache_key[0] for cache_key in util._CHECKSUM_CACHE}
+    assert str(unchanged_file) in cached_paths
+    assert str(changed_file) not in cached_paths
+
+
+def test_save_checksum_cache_unchanged(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the cache file is only rewritten once checksums were added."""
+    monkeypatch.setattr(util, "_CHECKSUM_CACHE", {})
+    first_file = tmp_path / "first.txt"
+    first_file.write_bytes(b"first")
+    calculate_file_checksum(first_file)
+
+    cache_file = tmp_path / "cache" / "checksums.json"
+    save_checksum_cache(cache_file)
+    load_checksum_cache(cache_file)
+    cache_file.write_text("unchanged")
+    save_checksum_cache(cache_file)
+    assert cache_file.read_text() == "unchanged"
+
+    second_file = tmp_path / "second.txt"
+    second_file.write_bytes(b"second")
+    calculate_file_checksum(second_file)
+    save_checksum_cache(cache_file)
+    cached_paths = {entry[0] for entry in json.loads(cache_file.read_text())["entries"]}
+    assert cached_paths == {str(first_file), str(second_file)}
+
+
+def test_calculate_file_checksums_batch(tmp_path: Path) -> None:
+    """Test batch checksums come back in input order."""
+    contents = [f"file {i}".encode() * i for i in range(20)]
+    file_paths = []
+    for i, content in enumerate(contents):
+        file_path = tmp_path / f"file{i}.txt"
+        file_path.write_bytes(content)
+        file_paths.append(file_path)
+
+    assert list(calculate_file_checksums_batch(file_paths)) == [
+        _checksum(content) for content in contents
+    ]
+
+
+def test_calculate_file_checksums_batch_missing_file(tmp_path: Path) -> None:
+    """Test a missing file raises when its checksum is reached."""
+    existing_file = tmp_path / "existing.txt"
+    existing_file.write_bytes(b"existing")
+
+    checksums = calculate_file_checksums_batch([existing_file, tmp_path / "missing"])
+    assert next(checksums) == _checksum(b"existing")
+    with pytest.raises(ValueError):
+        next(checksums)
+
+
+@pytest.fixture
+def io_uring_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Route batch checksums through io_uring, skipping where unavailable."""
+    pytest.importorskip("liburing")
+    monkeypatch.setenv("CRPATCHER_IO_URING", "1")
+    if not util._io_uring.is_enabled():
+        pytest.skip("io_uring is only supported on Linux")
+    monkeypatch.setattr(util, "_CHECKSUM_CACHE", {})
+    monkeypatch.setattr(util, "_IO_URING_MIN_BATCH_SIZE", 0)
+
+
+@pytest.mark.usefixtures("io_uring_enabled")
+def test_calculate_file_checksums_batch_io_uring(tmp_path: Path) -> None:
+    """Test io_uring checksums match xxh3-128 of the contents across chunk boundaries."""
+    sizes = [0, 1, 1 << 20, (1 << 20) + 1, 3 << 20] + [100] * 40
+    contents = [bytes(i % 251 for i in range(size)) for size in sizes]
+    file_paths = []
+    for i, content in enumerate(contents):
+        file_path = tmp_path / f"file{i}.bin"
+        file_path.write_bytes(content)
+        file_paths.append(file_path)
+
+    assert list(calculate_file_checksums_batch(file_paths)) == [
+        _checksum(content) for content in contents
+    ]
+
+
+@pytest.mark.usefixtures("io_uring_enabled")
+def test_calculate_file_checksums_batch_io_uring_missing_file(tmp_path: Path) -> None:
+    """Test a missing file raises in order on the io_uring path."""
+    existing_file = tmp_path / "existing.txt"
+    existing_file.write_bytes(b"existing")
+
+    checksums = calculate_file_checksums_batch([existing_file, tmp_path / "missing"])
+    assert next(checksums) == _checksum(b"existing")
+    with pytest.raises(ValueError):
+        next(checksums)
+
+
+def test_invalidate_checksum_cache(tmp_path: Path) -> None:
+    """Test a rewrite that keeps mtime and size is picked up after invalidation."""
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"before")
+    stat_result = file_path.stat()
+    assert calculate_file_checksum(file_path) == _checksum(b"before")
+
+    file_path.write_bytes(b"after!")
+    os.utime(file_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    assert calculate_file_checksum(file_path) == _checksum(b"before")
+
+    invalidate_checksum_cache([file_path])
+    assert calculate_file_checksum(file_path) == _checksum(b"after!")
+
+
+def test_invalidate_checksum_cache_while_hashing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test invalidation is safe while another thread adds checksums."""
+    file_paths = []
+    for i in range(500):
+        file_path = tmp_path / f"file{i}.txt"
+        file_path.write_bytes(b"%d" % i)
+        file_paths.append(file_path)
+    errors: List[BaseException] = []
+
+    def hash_files() -> None:
+        try:
+            for file_path in file_paths:
+                calculate_file_checksum(file_path)
+        except BaseException as err:
+            errors.append(err)
+
+    # Enough entries that the invalidation scan overlaps with hashing
+    monkeypatch.setattr(
+        util,
+        "_CHECKSUM_CACHE",
+        {(f"/unrelated/{i}", 0, 0, 0): "" for i in range(100000)},
+    )
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=hash_files)
+    try:
+        thread.start()
+        while thread.is_alive():
+            invalidate_checksum_cache([tmp_path / "other.txt"])
+    finally:
+        thread.join()
+        sys.setswitchinterval(switch_interval)
+
+    assert not errors
+    invalidate_checksum_cache(file_paths)
+    assert len(util._CHECKSUM_CACHE) == 100000
+
+
+def test_load_checksum_cache_other_algorithm(tmp_path: Path) -> None:
+    """Test a cache saved with another checksum algorithm is ignored."""
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"content")
+    stat_result = file_path.stat()
+    entry = [
+        str(file_path),
+        stat_result.st_mtime_ns,
+        stat_result.st_size,
+        stat_result.st_ino,
+        "x",
+    ]
+    cache_file = tmp_path / "cache.json"
+    util._CHECKSUM_CACHE.clear()
+
+    cache_file.write_text(
+        json.dumps({"algorithm": "sha256", "version": 2, "entries": [entry]})
+    )
+    load_checksum_cache(cache_file)
+    assert not util._CHECKSUM_CACHE
+
+    # With the matching algorithm the same entry is loaded
+    cache_file.write_text(
+        json.dumps({"algorithm": "xxh3_128", "version": 2, "entries": [entry]})
+    )
+    load_checksum_cache(cache_file)
+    assert list(util._CHECKSUM_CACHE.values()) == ["x"]
+
+
+def test_calculate_file_checksum_after_replace(tmp_path: Path) -> None:
+    """Test a file replaced by a rename with the same mtime and size is rehashed."""
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"before")
+    stat_result = file_path.stat()
+    assert calculate_file_checksum(file_path) == _checksum(b"before")
+
+    new_file_path = tmp_path / "file.txt.new"
+    new_file_path.write_bytes(b"after!")
+    os.utime(new_file_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    os.replace(new_file_path, file_path)
+    assert calculate_file_checksum(file_path) == _checksum(b"after!")
+
+
+def test_is_file_unchanged(tmp_path: Path) -> None:
+    """Test recorded mtime and size are compared against the current stat."""
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"content")
+    stat_result = file_path.stat()
+
+    assert is_file_unchanged(file_path, stat_result.st_mtime_ns, stat_result.st_size)
+    assert not is_file_unchanged(file_path, stat_result.st_mtime_ns, None)
+    assert not is_file_unchanged(
+        file_path, stat_result.st_mtime_ns + 1, stat_result.st_size
+    )
+    assert not is_file_unchanged(
+        tmp_path / "missing", stat_result.st_mtime_ns, stat_result.st_size
+    )
+
+
+def _assert_read_files_batch(tmp_path: Path) -> None:
+    sizes = [0, 1, 100, (1 << 20) + 1]
+    contents = [bytes(i % 251 for i in range(size)) for size in sizes]
+    file_paths = []
+    for i, content in enumerate(contents):
+        file_path = tmp_path / f"file{i}.bin"
+        file_path.write_bytes(content)
+        file_paths.append(file_path)
+
+    assert read_files_batch(file_paths + [tmp_path / "missing"]) == contents + [None]
+
+
+def test_read_files_batch(tmp_path: Path) -> None:
+    """Test files are read in order and unreadable ones come back as None."""
+    _assert_read_files_batch(tmp_path)
+
+
+@pytest.mark.usefixtures("io_uring_enabled")
+def test_read_files_batch_io_uring(tmp_path: Path) -> None:
+    """Test io_uring reads match the files across chunk boundaries."""
+    _assert_read_files_batch(tmp_path)
+
+
+def test_map_concurrently() -> None:
+    """Test results keep argument order and the first failure is raised."""
+    assert map_concurrently(pow, [2, 3, 4], [3, 2, 1]) == [8, 9, 4]
+    assert map_concurrently(pow, [], []) == []
+
+    with pytest.raises(ZeroDivisionError):
+        map_concurrently(lambda x: 1 // x, [1, 0, 2])
+
+
+def test_map_concurrently_nested(tmp_path: Path) -> None:
+    """Test nested concurrent steps run inline on the thread of the outer call."""
+    file_path = tmp_path / "file.txt"
+    file_path.write_bytes(b"content")
+
+    def run(index: int) -> List[str]:
+        outer_thread = threading.current_thread()
+        inner_threads = map_concurrently(lambda _: threading.current_thread(), range(4))
+        assert all(thread is outer_thread for thread in inner_threads)
+        assert read_files_batch([file_path, file_path]) == [b"content"] * 2
+        return list(calculate_file_checksums_batch([file_path] * 4))
+
+    results = map_concurrently(run, range(8))
+    assert results == [[_checksum(b"content")] * 4] * 8
+
+
+def test_run_git_looks_up_git_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test PATH is searched for git by the first command only."""
+    lookups = []
+    original_which = shutil.which
+
+    def which(name: str) -> Optional[str]:
+        lookups.append(name)
+        return original_which(name)
+
+    monkeypatch.setattr(util, "_git_executable", None)
+    monkeypatch.setattr(util.shutil, "which", which)
+    for _ in range(2):
+        assert util.run_git(tmp_path, ["--version"]).startswith("git version")
+    assert lookups == ["git"]
+
+
+def test_run_git_stream(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test records are split across read chunks and failures raise at the end."""
+    monkeypatch.setattr(util, "_STREAM_CHUNK_SIZE", 3)
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    names = ["a.txt", "dir with space/b.txt", "c"]
+    for name in names:
+        tmp_path.joinpath(name).parent.mkdir(exist_ok=True)
+        tmp_path.joinpath(name).write_text(name)
+    subprocess.run(["git", "add", "-A"], cwd=tmp_path, check=True)
+
+    records = run_git_stream(tmp_path, ["ls-files", "-z"], separator="\0")
+    assert sorted(records) == sorted(names)
+
+    with pytest.raises(RuntimeError):
+        list(
+            run_git_stream(tmp_path, ["ls-files", "--no-such-option"], log_error=False)
+        )